@@ -0,0 +1,132 @@
+"""
+Measure download throughput against a local mock EDGAR server
+
+Sweeps the number of workers so concurrency and rate limit settings
+can be tuned without sending any traffic to the SEC. Every filing downloaded
+has its own accession number (copies of the bundled Apple 10-K), and each run is
+timed both fetching only the documents listed on the filing index page (selective)
+and fetching the full submission.
+
+Usage:
+    python benchmarks/bench_download.py [--filings 200] [--latency 0.05] [--server-rate-limit 10]
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from cayce.mock_edgar import DEFAULT_FIXTURE_DIR, MockEdgarServer
+from cayce.query import EdgarIndex
+from cayce import web
+
+_CIK = "320193"
+_ACCESSION = "0000320193-20-000096"
+
+
+def _make_fixtures(fixture_dir: str, filings: int) -> pd.DataFrame:
+    """
+    Copy the Apple 10-K fixture under `filings` distinct accession numbers
+
+    Returns:
+        pd.DataFrame: Search records for the copies
+    """
+    source_dir = path.join(DEFAULT_FIXTURE_DIR, "Archives", "edgar", "data", _CIK)
+    target_dir = path.join(fixture_dir, "Archives", "edgar", "data", _CIK)
+    source_folder = _ACCESSION.replace("-", "")
+    with open(path.join(source_dir, f"{_ACCESSION}.txt")) as f:
+        submission = f.read()
+    with open(path.join(source_dir, source_folder, f"{_ACCESSION}-index.htm")) as f:
+        index_page = f.read()
+
+    records = []
+    for i in range(filings):
+        accession = f"0000320193-20-{900000 + i:06d}"
+        folder = accession.replace("-", "")
+        shutil.copytree(
+            path.join(source_dir, source_folder),
+            path.join(target_dir, folder),
+            ignore=shutil.ignore_patterns("*-index.htm"),
+        )
+        with open(path.join(target_dir, folder, f"{accession}-index.htm"), "w") as f:
+            f.write(index_page.replace(source_folder, folder))
+        with open(path.join(target_dir, f"{accession}.txt"), "w") as f:
+            f.write(submission.replace(_ACCESSION, accession))
+        records.append(
+            [
+                "APPLE INC",
+                "10-K",
+                _CIK,
+                pd.Timestamp(2020, 10, 30),
+                f"edgar/data/{_CIK}/{accession}.txt",
+            ]
+        )
+    return pd.DataFrame(
+        records, columns=["company", "form_type", "cik", "date_filed", "file_name"]
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--filings", type=int, default=200)
+    arg_parser.add_argument("--latency", type=float, default=0.05)
+    arg_parser.add_argument("--throttle-rate", type=float, default=0.0)
+    arg_parser.add_argument("--server-rate-limit", type=float, default=None)
+    arg_parser.add_argument("--client-rate-limit", type=float, default=None)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = arg_parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp()
+    try:
+        search_df = _make_fixtures(fixture_dir, args.filings)
+        records = search_df.values.tolist()
+
+        web.set_rate_limit(args.client_rate_limit)
+        print(
+            f"{'mode':>10}{'workers':>8}{'seconds':>10}{'filings/s':>12}"
+            f"{'requests':>10}{'200s':>8}{'429s':>8}"
+        )
+        for selective in [True, False]:
+            for workers in args.workers:
+                cache_dir = tempfile.mkdtemp()
+                server = MockEdgarServer(
+                    fixture_dir,
+                    latency=args.latency,
+                    throttle_rate=args.throttle_rate,
+                    rate_limit=args.server_rate_limit,
+                )
+                try:
+                    web.set_base_url(server.start())
+                    index = EdgarIndex(cache_dir)
+                    start_time = time.monotonic()
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        file_names = list(
+                            executor.map(
+                                lambda record: index.download_xbrl(
+                                    record, selective=selective
+                                ),
+                                records,
+                            )
+                        )
+                    elapsed = time.monotonic() - start_time
+                finally:
+                    server.stop()
+                    shutil.rmtree(cache_dir)
+                # each filing was written to a file of its own
+                assert len(set(file_names)) == args.filings
+
+                print(
+                    f"{'selective' if selective else 'full':>10}{workers:>8}{elapsed:>10.2f}"
+                    f"{args.filings / elapsed:>12.1f}{sum(server.stats.values()):>10}"
+                    f"{server.stats[200]:>8}{server.stats[429]:>8}"
+                )
+    finally:
+        shutil.rmtree(fixture_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure cold-start cost of the package's common entry points
+
+Each scenario runs in a fresh interpreter so module caches don't skew the numbers.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--rows 500000]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _make_cache_dir(rows: int) -> str:
+    """Build a cache directory holding a synthetic filing index of `rows` rows"""
+    cache_dir = tempfile.mkdtemp()
+    with open(os.path.join(cache_dir, "edgar_filings.idx"), "w") as f:
+        f.write("company,form_type,cik,date_filed,file_name\n")
+        for i in range(rows):
+            cik = 1000 + i % 5000
+            f.write(
+                f"COMPANY {cik} INC,10-Q,{cik},2020-0{1 + i % 9}-15,"
+                f"edgar/data/{cik}/{cik:010d}-20-{i:06d}.txt\n"
+            )
+    return cache_dir
+
+
+def _time_snippet(snippet: str, repeat: int) -> float:
+    """Run a snippet in a fresh interpreter `repeat` times and return the median runtime"""
+    code = textwrap.dedent(f"""
+        import time
+        _start = time.perf_counter()
+        {snippet}
+        print(time.perf_counter() - _start)
+        """)
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=_REPO_ROOT, text=True
+        )
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--rows", type=int, default=500000)
+    args = arg_parser.parse_args()
+
+    cache_dir = _make_cache_dir(args.rows)
+    scenarios = {
+        "import cayce.cik": "import cayce.cik",
+        "import cayce.query": "import cayce.query",
+        "EdgarIndex(cache_dir)": (
+            f"import cayce.query as q; idx = q.EdgarIndex({cache_dir!r})"
+        ),
+        "EdgarIndex(cache_dir) + load index": (
+            f"import cayce.query as q; idx = q.EdgarIndex({cache_dir!r}); "
+            "idx._load_index()"
+        ),
+    }
+
+    try:
+        print(f"{'scenario':<40}{'median (ms)':>12}")
+        for name, snippet in scenarios.items():
+            print(f"{name:<40}{_time_snippet(snippet, args.repeat) * 1000:>12.1f}")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
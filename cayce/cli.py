@@ -0,0 +1,390 @@
+"""
+Command line entry point for bulk searching, downloading and parsing EDGAR filings
+
+Every subcommand runs inside a single process with a single EdgarIndex,
+so a whole pipeline pays the index start up cost once and shares its caches.
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import csv
+import datetime as dt
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cayce.utils import lazy_import
+from cayce.log import get_logger
+from cayce import web
+
+pd = lazy_import("pandas")
+
+
+_LOG = get_logger(__name__)
+
+_FINANCIAL_STATEMENT_FORMS = ["10-K", "10-Q"]
+_BENEFICIAL_OWNERSHIP_FORMS = ["4"]
+
+
+def _parse_date(value: str) -> dt.date:
+    return dt.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _report(action: str, count: int, n_bytes: int, elapsed: float, errors: int = 0):
+    """Print throughput statistics for a completed step"""
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"{action}: {count} items, {n_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+        f"({count / elapsed:.1f} items/s, {n_bytes / 1e6 / elapsed:.2f} MB/s, "
+        f"{errors} errors)",
+        file=sys.stderr,
+    )
+
+
+def _read_table(file_name: str) -> pd.DataFrame:
+    """Read a CSV or Parquet file, as written by `_write_table`"""
+    if file_name.lower().endswith(".parquet"):
+        return pd.read_parquet(file_name)
+    return pd.read_csv(file_name, dtype={"cik": str}, parse_dates=["date_filed"])
+
+
+def _write_table(df: pd.DataFrame, file_name: str):
+    """Write to CSV or Parquet, depending on the file extension"""
+    if file_name.lower().endswith(".parquet"):
+        df.to_parquet(file_name, index=False)
+    else:
+        df.to_csv(file_name, index=False)
+
+
+def _get_form_type(file_name: str) -> str:
+    """
+    Pull the form type back out of a file name generated by `EdgarIndex.download_xbrl`,
+    ie {company}_{form_type}_{yyyymmdd}_{accession}.xml (or .htm for inline XBRL)
+    """
+    return os.path.basename(file_name).rsplit("_", 3)[1]
+
+
+def _parse_file(file_name: str) -> Tuple[pd.DataFrame, Optional[Dict[str, Any]]]:
+    """
+    Parse a single downloaded file with whichever parser suits its form type
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[Dict[str, Any]]]:
+            The parsed facts, and for financial statements their cover page
+            (see `financial_statement.cover_page`), for the parent process to record
+    """
+    form_type = _get_form_type(file_name)
+    cover_page = None
+    if form_type in _FINANCIAL_STATEMENT_FORMS and file_name.lower().endswith(".htm"):
+        from cayce.parsers import financial_statement, inline_xbrl
+
+        df = inline_xbrl.parse(file_name)
+        cover_page = financial_statement.cover_page(df)
+    elif form_type in _FINANCIAL_STATEMENT_FORMS:
+        from cayce.parsers import financial_statement
+
+        df = financial_statement.parse(file_name)
+        cover_page = financial_statement.cover_page(df)
+    elif form_type in _BENEFICIAL_OWNERSHIP_FORMS:
+        from cayce.parsers import form4
+
+        df = form4.parse(file_name)
+    else:
+        raise ValueError(f"Content parser not available for {form_type}")
+
+    df.insert(0, "file_name", os.path.basename(file_name))
+    return df, cover_page
+
+
+def _record_cover_page(metadata_index, file_name: str, cover_page: Dict[str, Any]):
+    """Add a cover page returned by `_parse_file` to the filing metadata index"""
+    from cayce.parsers.financial_statement import _accession, _date_filed
+
+    accession = _accession(file_name)
+    if accession is None:
+        _LOG.warning(f"No accession number in {file_name}, cover page not recorded")
+        return
+    metadata_index.add(accession, cover_page, _date_filed(file_name))
+
+
+def search(
+    index,
+    start_date: dt.date,
+    end_date: dt.date,
+    ciks: Optional[List[str]] = None,
+    form_types: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    start_time = time.monotonic()
+    result_df = index.search(start_date, end_date, ciks=ciks, form_types=form_types)
+    _report("search", len(result_df), 0, time.monotonic() - start_time)
+    return result_df
+
+
+def download(index, search_df: pd.DataFrame, workers: int) -> List[str]:
+    """
+    Download every filing in a search result, `workers` at a time
+
+    Returns:
+        List[str]: Local file names of everything successfully downloaded
+    """
+    columns = ["company", "form_type", "cik", "date_filed", "file_name"]
+    records = search_df[columns].values.tolist()
+
+    def _download(record):
+        try:
+            return index.download_xbrl(record)
+        except Exception as e:
+            _LOG.error(f"Failed to download {record[-1]}: {e}")
+            return None
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_download, records))
+    elapsed = time.monotonic() - start_time
+
+    file_names = [file_name for file_name in results if file_name is not None]
+    n_bytes = sum(os.path.getsize(file_name) for file_name in file_names)
+    _report(
+        "download", len(file_names), n_bytes, elapsed, len(results) - len(file_names)
+    )
+    return file_names
+
+
+def parse(file_names: List[str], workers: int, metadata_index=None) -> pd.DataFrame:
+    """
+    Parse downloaded filings into a single fact table, `workers` processes at a time
+
+    The cover page of each financial statement is also recorded in `metadata_index`
+    (a `FilingMetadataIndex`), if one is given.
+    """
+    start_time = time.monotonic()
+    frames = []
+    errors = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_file, file_name) for file_name in file_names]
+        for file_name, future in zip(file_names, futures):
+            try:
+                df, cover_page = future.result()
+            except Exception as e:
+                _LOG.error(f"Failed to parse {file_name}: {e}")
+                errors += 1
+                continue
+            frames.append(df)
+            # workers can't share the index, so it is filled in here as their results come back
+            if metadata_index is not None and cover_page is not None:
+                _record_cover_page(metadata_index, file_name, cover_page)
+    elapsed = time.monotonic() - start_time
+
+    n_bytes = sum(os.path.getsize(file_name) for file_name in file_names)
+    _report("parse", len(file_names) - errors, n_bytes, elapsed, errors)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _add_common_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(tempfile.gettempdir(), "edgar"),
+        help="Where EDGAR index and filing files are cached (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=10.0,
+        help="Maximum requests per second made to EDGAR; 0 for no limit (default: %(default)s)",
+    )
+
+
+def _add_workers_argument(parser: argparse.ArgumentParser):
+    """Only for the steps that fan out over filings; the index is refreshed a quarter at a time"""
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of parallel workers (default: %(default)s)",
+    )
+
+
+def _add_search_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--start-date", type=_parse_date, default=dt.date(1993, 1, 1), help="YYYY-MM-DD"
+    )
+    parser.add_argument(
+        "--end-date", type=_parse_date, default=dt.date.today(), help="YYYY-MM-DD"
+    )
+    parser.add_argument("--cik", action="append", dest="ciks", help="May be repeated")
+    parser.add_argument(
+        "--form-type", action="append", dest="form_types", help="May be repeated"
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cayce", description="Search, download and parse SEC EDGAR filings"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser(
+        "refresh-index", help="Download and cache the EDGAR filing index"
+    )
+    _add_common_arguments(refresh_parser)
+    refresh_parser.add_argument(
+        "--start-date", type=_parse_date, default=dt.date(1993, 1, 1), help="YYYY-MM-DD"
+    )
+    refresh_parser.add_argument(
+        "--end-date", type=_parse_date, default=dt.date.today(), help="YYYY-MM-DD"
+    )
+
+    search_parser = subparsers.add_parser(
+        "search", help="Search the filing index, writing results to CSV or Parquet"
+    )
+    _add_common_arguments(search_parser)
+    _add_search_arguments(search_parser)
+    search_parser.add_argument("--output", required=True, help="*.csv or *.parquet")
+
+    download_parser = subparsers.add_parser(
+        "download", help="Download every filing listed in a search result file"
+    )
+    _add_common_arguments(download_parser)
+    _add_workers_argument(download_parser)
+    download_parser.add_argument(
+        "input", help="Search result file (*.csv or *.parquet)"
+    )
+
+    parse_parser = subparsers.add_parser(
+        "parse", help="Parse a directory of downloaded filings into one fact table"
+    )
+    _add_common_arguments(parse_parser)
+    _add_workers_argument(parse_parser)
+    parse_parser.add_argument("input_dir", help="Directory of downloaded filings")
+    parse_parser.add_argument("--output", required=True, help="*.csv or *.parquet")
+
+    pipeline_parser = subparsers.add_parser(
+        "pipeline", help="Search, download and parse in one process"
+    )
+    _add_common_arguments(pipeline_parser)
+    _add_workers_argument(pipeline_parser)
+    _add_search_arguments(pipeline_parser)
+    pipeline_parser.add_argument("--output", required=True, help="*.csv or *.parquet")
+
+    export_parser = subparsers.add_parser(
+        "export-index",
+        help="Export the filing index as memory mapped files, for worker processes to share",
+    )
+    _add_common_arguments(export_parser)
+    export_parser.add_argument(
+        "--start-date", type=_parse_date, default=dt.date(1993, 1, 1), help="YYYY-MM-DD"
+    )
+    export_parser.add_argument(
+        "--end-date", type=_parse_date, default=dt.date.today(), help="YYYY-MM-DD"
+    )
+    export_parser.add_argument("output_dir", help="Directory to export the index to")
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Print new filings (as CSV rows) as soon as EDGAR accepts them"
+    )
+    _add_common_arguments(watch_parser)
+    watch_parser.add_argument(
+        "--cik", action="append", dest="ciks", help="May be repeated"
+    )
+    watch_parser.add_argument(
+        "--form-type", action="append", dest="form_types", help="May be repeated"
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Seconds between polls (default: %(default)s)",
+    )
+    watch_parser.add_argument(
+        "--download",
+        action="store_true",
+        help="Also download each new filing into the cache directory",
+    )
+
+    return parser
+
+
+def watch(index, watcher, download_filings: bool = False):
+    """Print each new filing found by a `FilingWatcher` as a CSV row, until interrupted"""
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["company", "form_type", "cik", "date_filed", "file_name"])
+    sys.stdout.flush()
+    try:
+        for record in watcher.watch():
+            writer.writerow(record[:3] + [f"{record[3]:%Y-%m-%d}", record[4]])
+            sys.stdout.flush()
+            if download_filings and record[1] in (
+                _FINANCIAL_STATEMENT_FORMS + _BENEFICIAL_OWNERSHIP_FORMS
+            ):
+                try:
+                    index.download_xbrl(record)
+                except Exception as e:
+                    _LOG.error(f"Failed to download {record[-1]}: {e}")
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv: Optional[List[str]] = None):
+    args = _build_parser().parse_args(argv)
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    web.set_rate_limit(args.rate_limit or None)
+
+    from cayce.query import EdgarIndex
+
+    with EdgarIndex(args.cache_dir) as index:
+        _run(index, args)
+
+
+def _run(index, args: argparse.Namespace):
+    if args.command == "refresh-index":
+        start_time = time.monotonic()
+        index._refresh_index(args.start_date, args.end_date)
+        _report("refresh-index", len(index), 0, time.monotonic() - start_time)
+    elif args.command == "search":
+        result_df = search(
+            index, args.start_date, args.end_date, args.ciks, args.form_types
+        )
+        _write_table(result_df, args.output)
+    elif args.command == "download":
+        download(index, _read_table(args.input), args.workers)
+    elif args.command == "parse":
+        from cayce.parsers.financial_statement import is_linkbase_file
+
+        file_names = sorted(
+            file_name
+            for extension in ["xml", "htm"]
+            for file_name in glob.glob(os.path.join(args.input_dir, f"*.{extension}"))
+            if not is_linkbase_file(file_name)
+        )
+        _write_table(parse(file_names, args.workers, index.metadata), args.output)
+    elif args.command == "pipeline":
+        result_df = search(
+            index, args.start_date, args.end_date, args.ciks, args.form_types
+        )
+        file_names = download(index, result_df, args.workers)
+        _write_table(parse(file_names, args.workers, index.metadata), args.output)
+    elif args.command == "export-index":
+        from cayce.shared_index import export_index
+
+        start_time = time.monotonic()
+        index._refresh_index(args.start_date, args.end_date)
+        export_index(index, args.output_dir)
+        _report("export-index", len(index), 0, time.monotonic() - start_time)
+    elif args.command == "watch":
+        from cayce.watch import FilingWatcher
+
+        watch(
+            index,
+            FilingWatcher(args.ciks, args.form_types, poll_interval=args.interval),
+            args.download,
+        )
+
+
+if __name__ == "__main__":
+    main()
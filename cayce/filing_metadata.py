@@ -0,0 +1,223 @@
+"""
+A small index of cover page facts (fiscal period, fiscal year end, shares outstanding...)
+for filings that have already been parsed, one row per accession number
+
+Filled in by `financial_statement.parse` (or `inline_xbrl.parse`) when given a `metadata_index`,
+and saved next to the filing index in the cache directory, so that filings can be screened
+on these facts later without downloading or parsing any of them again.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from os import path
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from cayce.utils import atomic_write, lazy_import
+from cayce.log import get_logger
+from cayce.query import _parse_ciks
+
+pd = lazy_import("pandas")
+
+
+_LOG = get_logger(__name__)
+
+_METADATA_COLUMNS = [
+    "accession",
+    "cik",
+    "company",
+    "form_type",
+    "date_filed",
+    "period_end",
+    "fiscal_year",
+    "fiscal_period",
+    "fiscal_year_end",
+    "shares_outstanding",
+]
+
+
+class FilingMetadataIndex:
+    def __init__(self, cache_dir: str):
+        """
+        Open the filing metadata index kept in a cache directory (or start a new one)
+
+        One instance can be shared between threads.
+
+        Args:
+            cache_dir (str): Local path where the index is stored, usually that of an `EdgarIndex`
+        """
+        self._cache_file = path.join(cache_dir, "filing_metadata.idx")
+        self._lock = threading.RLock()
+        # accession -> row; read from disk on first use
+        self._rows: Optional[Dict[str, tuple]] = None
+        self._dirty = False
+        # the rows as a DataFrame, kept between screens until the next change
+        self._frame: Optional[pd.DataFrame] = None
+
+    def _load(self) -> Dict[str, tuple]:
+        rows = self._rows
+        if rows is not None:
+            return rows
+
+        with self._lock:
+            if self._rows is not None:
+                return self._rows
+
+            rows = {}
+            if path.exists(self._cache_file):
+                _LOG.info(f"Loading filing metadata from {self._cache_file}")
+                cached_df = pd.read_csv(
+                    self._cache_file,
+                    dtype={
+                        "accession": str,
+                        "cik": str,
+                        "company": str,
+                        "form_type": str,
+                        "fiscal_period": str,
+                        "fiscal_year_end": str,
+                    },
+                    parse_dates=["date_filed", "period_end"],
+                )
+                cached_df["fiscal_year"] = cached_df["fiscal_year"].astype("Int64")
+                cached_df = cached_df.astype(object).where(cached_df.notna(), None)
+                for row in cached_df[_METADATA_COLUMNS].itertuples(index=False):
+                    rows[row[0]] = tuple(row)
+            self._rows = rows
+            return rows
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def add(
+        self,
+        accession: str,
+        cover_page: Dict[str, Any],
+        date_filed: Optional[dt.date] = None,
+    ):
+        """
+        Record (or replace) the cover page facts of one filing
+
+        Args:
+            accession (str): Accession number of the filing, eg 0000320193-20-000096
+            cover_page (Dict[str, Any]): As returned by `financial_statement.cover_page`
+            date_filed (dt.date, optional): When the filing was made, if known. Defaults to None.
+        """
+        row = {**cover_page, "accession": accession, "date_filed": date_filed}
+        for column in ["date_filed", "period_end"]:
+            if row.get(column) is not None:
+                row[column] = pd.Timestamp(row[column])
+
+        with self._lock:
+            self._load()[accession] = tuple(
+                row.get(column) for column in _METADATA_COLUMNS
+            )
+            self._dirty = True
+            self._frame = None
+
+    def _to_frame(self) -> pd.DataFrame:
+        frame = self._frame
+        if frame is not None:
+            return frame
+
+        with self._lock:
+            frame = pd.DataFrame(list(self._load().values()), columns=_METADATA_COLUMNS)
+            frame["date_filed"] = pd.to_datetime(frame["date_filed"])
+            frame["period_end"] = pd.to_datetime(frame["period_end"])
+            frame["fiscal_year"] = frame["fiscal_year"].astype("Int64")
+            frame["shares_outstanding"] = frame["shares_outstanding"].astype(float)
+            self._frame = frame
+            return frame
+
+    def screen(
+        self,
+        start_date: dt.date = None,
+        end_date: dt.date = None,
+        ciks: Union[str, List[str]] = None,
+        form_types: Union[str, List[str]] = None,
+        fiscal_periods: Union[str, List[str]] = None,
+        fiscal_year_end_months: Union[int, List[int]] = None,
+        min_shares_outstanding: float = None,
+        max_shares_outstanding: float = None,
+    ) -> pd.DataFrame:
+        """
+        Find filings whose cover page matches a provided criteria,
+        eg every 10-K filed in the last 30 days by a company whose fiscal year ends in June:
+
+            index.screen(dt.date.today() - dt.timedelta(days=30), form_types="10-K", fiscal_year_end_months=6)
+
+        Only filings recorded by `add` (ie parsed with this index) are considered.
+
+        Args:
+            start_date (dt.date, optional): Earliest date filed to accept. Defaults to None, which doesn't filter.
+            end_date (dt.date, optional): Latest date filed to accept. Defaults to None, which doesn't filter.
+            ciks (Union[str, List[str]], optional): One or more CIK values to filter on. Defaults to None.
+            form_types (Union[str, List[str]], optional): One or more form types to filter on. Defaults to None.
+            fiscal_periods (Union[str, List[str]], optional):
+                One or more fiscal period focuses (FY, Q1, Q2, Q3) to filter on. Defaults to None.
+            fiscal_year_end_months (Union[int, List[int]], optional):
+                One or more months (1-12) the filer's fiscal year can end in. Defaults to None.
+            min_shares_outstanding (float, optional): Fewest shares outstanding to accept. Defaults to None.
+            max_shares_outstanding (float, optional): Most shares outstanding to accept. Defaults to None.
+
+        Returns:
+            pd.DataFrame: Matching rows of the index, sorted by date filed
+        """
+        if isinstance(ciks, str):
+            ciks = [ciks]
+        if isinstance(form_types, str):
+            form_types = [form_types]
+        if isinstance(fiscal_periods, str):
+            fiscal_periods = [fiscal_periods]
+        if isinstance(fiscal_year_end_months, int):
+            fiscal_year_end_months = [fiscal_year_end_months]
+
+        metadata_df = self._to_frame()
+        mask = pd.Series(True, index=metadata_df.index)
+        if start_date is not None:
+            mask &= metadata_df["date_filed"] >= pd.to_datetime(start_date)
+        if end_date is not None:
+            mask &= metadata_df["date_filed"] <= pd.to_datetime(end_date)
+        if ciks:
+            mask &= metadata_df["cik"].isin([str(cik) for cik in _parse_ciks(ciks)])
+        if form_types:
+            mask &= metadata_df["form_type"].isin(form_types)
+        if fiscal_periods:
+            mask &= metadata_df["fiscal_period"].isin(fiscal_periods)
+        if fiscal_year_end_months:
+            # --MM-DD
+            months = pd.to_numeric(
+                metadata_df["fiscal_year_end"].str[2:4], errors="coerce"
+            )
+            mask &= months.isin(fiscal_year_end_months)
+        if min_shares_outstanding is not None:
+            mask &= metadata_df["shares_outstanding"] >= min_shares_outstanding
+        if max_shares_outstanding is not None:
+            mask &= metadata_df["shares_outstanding"] <= max_shares_outstanding
+
+        return (
+            metadata_df[mask]
+            .sort_values("date_filed", kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def flush(self):
+        """
+        Save the index to its cache directory, if anything has been added since it was last saved
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            with atomic_write(self._cache_file, newline="") as f:
+                self._to_frame().to_csv(f, index=False, date_format="%Y-%m-%d")
+            self._dirty = False
+            _LOG.info(
+                f"Saved metadata for {len(self._rows)} filings to {self._cache_file}"
+            )
+
+    def __enter__(self) -> "FilingMetadataIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
@@ -0,0 +1,370 @@
+"""
+Incrementally maintained insider trading aggregates over parsed Form 4 data
+
+Transactions are appended to flat, typed column buffers (tickers and owners
+dictionary encoded) as each Form 4 is parsed, and per ticker/owner running totals
+are updated in place, so nothing about history needs recomputing.
+Windowed queries binary search a date-sorted view of the buffers.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from typing import Dict, List, Optional, Tuple
+
+from cayce.utils import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+_EPOCH = dt.date(1970, 1, 1)
+
+
+def _to_day(date: dt.date) -> int:
+    """Days since 1970-01-01"""
+    return (date - _EPOCH).days
+
+
+def _from_day(day: int) -> dt.date:
+    return _EPOCH + dt.timedelta(days=int(day))
+
+
+class _Encoder:
+    """Map strings to dense integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, values) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+
+class InsiderActivity:
+    _COLUMNS = {
+        "ticker": "int32",
+        "owner": "int32",
+        "day": "int32",
+        "shares": "float64",
+        "value": "float64",
+        # open market purchase, as opposed to a grant, award, exercise or sale
+        "purchase": "bool",
+    }
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Create an empty aggregation engine; feed it with `update`
+
+        Args:
+            initial_capacity (int, optional): Number of transactions to allocate room for up front
+        """
+        self._tickers = _Encoder()
+        self._owners = _Encoder()
+        self._size = 0
+        self._buffers = {
+            name: np.empty(initial_capacity, dtype=dtype)
+            for name, dtype in self._COLUMNS.items()
+        }
+        # (ticker, owner) -> position in the running total arrays
+        self._pair_ids: Dict[Tuple[int, int], int] = {}
+        self._pair_net_shares = np.zeros(0, dtype=np.float64)
+        self._pair_net_value = np.zeros(0, dtype=np.float64)
+        self._pair_last_day = np.zeros(0, dtype=np.int32)
+
+        self._seen_filings = set()
+        # indices of the buffers, sorted by day; rebuilt lazily after an update
+        self._day_order: Optional[np.ndarray] = None
+        self._sorted_days: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, n: int):
+        required = self._size + n
+        capacity = len(self._buffers["day"])
+        if required <= capacity:
+            return
+        new_capacity = max(required, capacity * 2)
+        for name, buffer in self._buffers.items():
+            grown = np.empty(new_capacity, dtype=buffer.dtype)
+            grown[: self._size] = buffer[: self._size]
+            self._buffers[name] = grown
+
+    def _column(self, name: str) -> np.ndarray:
+        return self._buffers[name][: self._size]
+
+    def update(self, form4_df: pd.DataFrame, filing_id: Optional[str] = None) -> int:
+        """
+        Add transactions, as returned by `cayce.parsers.form4.parse`
+
+        Args:
+            form4_df (pd.DataFrame): Parsed Form 4 transactions
+            filing_id (str, optional):
+                Unique identifier for the filing (eg accession number or file name).
+                A filing that has already been added is ignored.
+
+        Returns:
+            int: Number of transactions added
+        """
+        if filing_id is not None:
+            if filing_id in self._seen_filings:
+                return 0
+            self._seen_filings.add(filing_id)
+
+        n = len(form4_df)
+        if n == 0:
+            return 0
+
+        tickers = self._tickers.encode(
+            form4_df["ticker"].astype(str).str.upper().tolist()
+        )
+        owners = self._owners.encode(form4_df["owner"].astype(str).tolist())
+        days = (
+            pd.to_datetime(form4_df["transaction_date"])
+            .to_numpy()
+            .astype("datetime64[D]")
+            .astype(np.int32)
+        )
+        shares = form4_df["shares"].to_numpy(dtype=np.float64, na_value=0.0)
+        prices = form4_df["price"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # grants and other transactions without a price carry no dollar value
+        values = np.nan_to_num(shares * prices)
+        if "transaction_code" in form4_df:
+            purchases = (form4_df["transaction_code"] == "P").to_numpy(dtype=bool)
+        else:
+            # without transaction codes, count only priced acquisitions as purchases
+            purchases = (shares > 0) & (values > 0)
+
+        self._reserve(n)
+        new_rows = slice(self._size, self._size + n)
+        for name, column in zip(
+            self._COLUMNS, [tickers, owners, days, shares, values, purchases]
+        ):
+            self._buffers[name][new_rows] = column
+        self._size += n
+        self._day_order = None
+
+        pair_ids = np.empty(n, dtype=np.int64)
+        for i, pair in enumerate(zip(tickers.tolist(), owners.tolist())):
+            pair_id = self._pair_ids.get(pair)
+            if pair_id is None:
+                pair_id = self._pair_ids[pair] = len(self._pair_ids)
+            pair_ids[i] = pair_id
+
+        n_pairs = len(self._pair_ids)
+        if n_pairs > len(self._pair_net_shares):
+            grow_by = n_pairs - len(self._pair_net_shares)
+            self._pair_net_shares = np.concatenate(
+                [self._pair_net_shares, np.zeros(grow_by)]
+            )
+            self._pair_net_value = np.concatenate(
+                [self._pair_net_value, np.zeros(grow_by)]
+            )
+            self._pair_last_day = np.concatenate(
+                [self._pair_last_day, np.zeros(grow_by, dtype=np.int32)]
+            )
+        np.add.at(self._pair_net_shares, pair_ids, shares)
+        np.add.at(self._pair_net_value, pair_ids, values)
+        np.maximum.at(self._pair_last_day, pair_ids, days)
+
+        return n
+
+    def positions(self) -> pd.DataFrame:
+        """
+        Running net shares and dollar value per ticker and owner, over everything added so far
+        """
+        pairs = list(self._pair_ids.keys())
+        return pd.DataFrame(
+            {
+                "ticker": [self._tickers.values[ticker] for ticker, _ in pairs],
+                "owner": [self._owners.values[owner] for _, owner in pairs],
+                "net_shares": self._pair_net_shares[: len(pairs)],
+                "net_value": self._pair_net_value[: len(pairs)],
+                "last_transaction_date": [
+                    _from_day(day) for day in self._pair_last_day[: len(pairs)]
+                ],
+            }
+        )
+
+    def _window(
+        self, start_date: Optional[dt.date], end_date: Optional[dt.date]
+    ) -> np.ndarray:
+        """Indices of every transaction dated within [start_date, end_date], in date order"""
+        if self._day_order is None:
+            self._day_order = np.argsort(self._column("day"), kind="stable")
+            self._sorted_days = self._column("day")[self._day_order]
+        sorted_days = self._sorted_days
+
+        lo = (
+            0
+            if start_date is None
+            else np.searchsorted(sorted_days, _to_day(start_date), "left")
+        )
+        hi = (
+            len(sorted_days)
+            if end_date is None
+            else np.searchsorted(sorted_days, _to_day(end_date), "right")
+        )
+        return self._day_order[lo:hi]
+
+    def net_activity(
+        self,
+        start_date: Optional[dt.date] = None,
+        end_date: Optional[dt.date] = None,
+        by_owner: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Net insider buying/selling per ticker (and optionally owner) within a window
+
+        Args:
+            start_date (dt.date, optional): First transaction date to include. Defaults to the beginning of time.
+            end_date (dt.date, optional): Last transaction date to include. Defaults to the end of time.
+            by_owner (bool, optional): Break the totals down by owner too? Defaults to False.
+
+        Returns:
+            pd.DataFrame: ticker, [owner,] net_shares, net_value, bought_shares, sold_shares and transactions
+        """
+        rows = self._window(start_date, end_date)
+        tickers = self._column("ticker")[rows]
+        if by_owner:
+            keys = (
+                tickers.astype(np.int64) * len(self._owners.values)
+                + self._column("owner")[rows]
+            )
+        else:
+            keys = tickers.astype(np.int64)
+
+        unique_keys, groups = np.unique(keys, return_inverse=True)
+        shares = self._column("shares")[rows]
+        result = {}
+        if by_owner:
+            result["ticker"] = [
+                self._tickers.values[k // len(self._owners.values)] for k in unique_keys
+            ]
+            result["owner"] = [
+                self._owners.values[k % len(self._owners.values)] for k in unique_keys
+            ]
+        else:
+            result["ticker"] = [self._tickers.values[k] for k in unique_keys]
+        n_groups = len(unique_keys)
+        result["net_shares"] = np.bincount(groups, shares, n_groups)
+        result["net_value"] = np.bincount(groups, self._column("value")[rows], n_groups)
+        result["bought_shares"] = np.bincount(
+            groups, np.clip(shares, 0, None), n_groups
+        )
+        result["sold_shares"] = -np.bincount(groups, np.clip(shares, None, 0), n_groups)
+        result["transactions"] = np.bincount(groups, minlength=n_groups)
+        return pd.DataFrame(result)
+
+    def weekly_net(
+        self, start_date: Optional[dt.date] = None, end_date: Optional[dt.date] = None
+    ) -> pd.DataFrame:
+        """
+        Net insider shares and dollar value per ticker per week (weeks start on Monday)
+
+        Returns:
+            pd.DataFrame: ticker, week_start, net_shares, net_value
+        """
+        rows = self._window(start_date, end_date)
+        # 1970-01-01 was a Thursday, so shift by 3 days to land weeks on Mondays
+        weeks = (self._column("day")[rows].astype(np.int64) + 3) // 7
+        tickers = self._column("ticker")[rows].astype(np.int64)
+        first_week = weeks.min() if len(weeks) else 0
+        n_weeks = (weeks.max() - first_week + 1) if len(weeks) else 1
+        keys = tickers * n_weeks + (weeks - first_week)
+
+        unique_keys, groups = np.unique(keys, return_inverse=True)
+        n_groups = len(unique_keys)
+        return pd.DataFrame(
+            {
+                "ticker": [self._tickers.values[k // n_weeks] for k in unique_keys],
+                "week_start": [
+                    _from_day((k % n_weeks + first_week) * 7 - 3) for k in unique_keys
+                ],
+                "net_shares": np.bincount(
+                    groups, self._column("shares")[rows], n_groups
+                ),
+                "net_value": np.bincount(groups, self._column("value")[rows], n_groups),
+            }
+        )
+
+    def cluster_buys(
+        self,
+        window_days: int = 14,
+        min_owners: int = 3,
+        start_date: Optional[dt.date] = None,
+        end_date: Optional[dt.date] = None,
+    ) -> pd.DataFrame:
+        """
+        Find cluster buys: at least `min_owners` different insiders buying the same
+        ticker within `window_days` of each other. Only open market purchases (transaction code P)
+        count as buys, so grants, awards and option exercises never fire a signal.
+
+        Args:
+            window_days (int, optional): Length of the trailing window, in days. Defaults to 14.
+            min_owners (int, optional): Distinct buyers required for a signal. Defaults to 3.
+            start_date (dt.date, optional): Only consider buys on or after this date
+            end_date (dt.date, optional): Only consider buys on or before this date
+
+        Returns:
+            pd.DataFrame:
+                One row per ticker per day the signal fired (window_end), with
+                the number of distinct buyers and total shares and dollar value bought in the window
+        """
+        if window_days < 1:
+            raise ValueError(f"window_days must be at least 1, not {window_days}")
+
+        rows = self._window(start_date, end_date)
+        rows = rows[self._column("purchase")[rows]]
+        # rows are already in date order, so a stable sort keeps each ticker's buys in date order
+        rows = rows[np.argsort(self._column("ticker")[rows], kind="stable")]
+
+        tickers = self._column("ticker")[rows]
+        owners = self._column("owner")[rows]
+        days = self._column("day")[rows]
+        shares = self._column("shares")[rows]
+        values = self._column("value")[rows]
+
+        signals = []
+        ticker_starts = np.flatnonzero(np.diff(tickers, prepend=-1))
+        ticker_ends = np.append(ticker_starts[1:], len(rows))
+        for first, last in zip(ticker_starts.tolist(), ticker_ends.tolist()):
+            owner_counts: Dict[int, int] = {}
+            window_shares = window_value = 0.0
+            lo = first
+            for hi in range(first, last):
+                owner_counts[owners[hi]] = owner_counts.get(owners[hi], 0) + 1
+                window_shares += shares[hi]
+                window_value += values[hi]
+                while days[lo] <= days[hi] - window_days:
+                    owner_counts[owners[lo]] -= 1
+                    if owner_counts[owners[lo]] == 0:
+                        del owner_counts[owners[lo]]
+                    window_shares -= shares[lo]
+                    window_value -= values[lo]
+                    lo += 1
+
+                is_last_of_day = hi + 1 == last or days[hi + 1] != days[hi]
+                if is_last_of_day and len(owner_counts) >= min_owners:
+                    signals.append(
+                        (
+                            self._tickers.values[tickers[hi]],
+                            _from_day(days[hi]),
+                            len(owner_counts),
+                            window_shares,
+                            window_value,
+                        )
+                    )
+
+        return pd.DataFrame(
+            signals,
+            columns=["ticker", "window_end", "buyers", "bought_shares", "bought_value"],
+        )
@@ -0,0 +1,231 @@
+"""
+A local stand-in for the EDGAR website, serving recorded fixtures over HTTP
+
+Requests are mapped straight onto files under a fixture directory, eg
+/Archives/edgar/full-index/2020/QTR4/company.zip -> {fixture_dir}/Archives/edgar/full-index/2020/QTR4/company.zip.
+A company.zip that isn't on disk is built on the fly from a company.idx next to it,
+so fixtures can stay human readable. Responses carry an ETag, and conditional
+requests (If-None-Match) for unchanged content get a 304.
+
+Latency, random throttling (429s) and a server side rate limit can be injected,
+so retry behaviour and concurrency settings can be exercised without touching the SEC.
+
+Usage:
+    python -m cayce.mock_edgar --port 8000 --latency 0.05 --rate-limit 10
+    cayce --rate-limit 8 ... (with CAYCE_EDGAR_URL=http://127.0.0.1:8000)
+"""
+
+import argparse
+from collections import Counter, deque
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import os
+from os import path
+import random
+import threading
+import time
+from typing import Optional
+import zipfile
+
+from cayce.log import get_logger
+
+_LOG = get_logger(__name__)
+
+DEFAULT_FIXTURE_DIR = path.join(path.dirname(__file__), "tests", "fixtures", "edgar")
+
+
+class MockEdgarServer:
+    def __init__(
+        self,
+        fixture_dir: str = DEFAULT_FIXTURE_DIR,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        retry_after: int = 1,
+        seed: Optional[int] = None,
+    ):
+        """
+        Create a mock EDGAR server; call `start` (or use as a context manager) to serve
+
+        Args:
+            fixture_dir (str, optional): Root directory of the files to serve.
+                Defaults to the fixtures bundled with the tests.
+            host (str, optional): Interface to listen on. Defaults to 127.0.0.1.
+            port (int, optional): Port to listen on. Defaults to 0, which picks a free port.
+            latency (float, optional): Seconds to wait before answering each request. Defaults to 0.
+            throttle_rate (float, optional):
+                Probability (0-1) of answering any request with a 429. Defaults to 0.
+            rate_limit (float, optional):
+                Requests per second allowed before answering with a 429, like EDGAR's fair access policy.
+                Defaults to None, which doesn't limit anything.
+            retry_after (int, optional): Retry-After header sent with each 429. Defaults to 1.
+            seed (int, optional): Seed for the random throttling
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        # counts of responses by status code
+        self.stats = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent_requests = deque()
+        self._zip_cache = {}
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """
+        Serve requests on a background thread
+
+        Returns:
+            str: Base URL of the server
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+        _LOG.info(f"Mock EDGAR serving {self.fixture_dir} at {self.url}")
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockEdgarServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _is_throttled(self) -> bool:
+        with self._lock:
+            if self.throttle_rate and self._random.random() < self.throttle_rate:
+                return True
+
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._recent_requests and self._recent_requests[0] <= now - 1.0:
+                    self._recent_requests.popleft()
+                if len(self._recent_requests) >= self.rate_limit:
+                    return True
+                self._recent_requests.append(now)
+
+        return False
+
+    def _read_fixture(self, request_path: str) -> Optional[bytes]:
+        relative_path = request_path.split("?")[0].lstrip("/")
+        local_path = path.normpath(path.join(self.fixture_dir, relative_path))
+        # don't let anyone wander out of the fixture directory
+        if not local_path.startswith(path.normpath(self.fixture_dir) + os.sep):
+            return None
+
+        if path.isfile(local_path):
+            with open(local_path, "rb") as f:
+                return f.read()
+
+        if local_path.endswith(".zip"):
+            idx_path = local_path[: -len(".zip")] + ".idx"
+            if path.isfile(idx_path):
+                with self._lock:
+                    if idx_path not in self._zip_cache:
+                        buffer = io.BytesIO()
+                        with zipfile.ZipFile(
+                            buffer, "w", zipfile.ZIP_DEFLATED
+                        ) as zipped:
+                            zipped.write(idx_path, path.basename(idx_path))
+                        self._zip_cache[idx_path] = buffer.getvalue()
+                    return self._zip_cache[idx_path]
+
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server._is_throttled():
+                    self._respond(
+                        429,
+                        b"Request Rate Threshold Exceeded",
+                        {"Retry-After": str(server.retry_after)},
+                    )
+                    return
+
+                content = server._read_fixture(self.path)
+                if content is None:
+                    self._respond(404, b"Not Found")
+                    return
+
+                etag = f'"{hashlib.sha1(content).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._respond(304, b"", {"ETag": etag})
+                else:
+                    self._respond(200, content, {"ETag": etag})
+
+            def _respond(self, status: int, content: bytes, headers: dict = None):
+                with server._lock:
+                    server.stats[status] += 1
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                _LOG.debug(format % args)
+
+        return _Handler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve EDGAR fixtures locally")
+    arg_parser.add_argument("--fixture-dir", default=DEFAULT_FIXTURE_DIR)
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--latency", type=float, default=0.0)
+    arg_parser.add_argument("--throttle-rate", type=float, default=0.0)
+    arg_parser.add_argument("--rate-limit", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    server = MockEdgarServer(
+        args.fixture_dir,
+        args.host,
+        args.port,
+        args.latency,
+        args.throttle_rate,
+        args.rate_limit,
+    )
+    print(f"Serving {args.fixture_dir} at {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+        print(dict(server.stats))
+
+
+if __name__ == "__main__":
+    main()
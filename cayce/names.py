@@ -0,0 +1,126 @@
+"""
+Fuzzy lookup of company names to CIK codes
+
+Names are normalized (case, punctuation, state-of-incorporation tags and
+corporate suffixes like INC/CORP are dropped) and broken into trigrams,
+which are kept in an inverted index so a lookup only touches names
+that share at least one trigram with the query.
+"""
+
+from collections import Counter
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+_STATE_TAG_RE = re.compile(r"/[A-Z]{2,}/?")
+_NON_ALPHANUMERIC_RE = re.compile(r"[^A-Z0-9]+")
+_SUFFIXES = {
+    "CO",
+    "COMPANY",
+    "CORP",
+    "CORPORATION",
+    "INC",
+    "INCORPORATED",
+    "LLC",
+    "LP",
+    "LTD",
+    "LIMITED",
+    "PLC",
+    "THE",
+}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Reduce a company name to a canonical form, so that
+    "Apple Inc.", "APPLE INC" and "APPLE INC /CA/" all compare equal
+    """
+    name = _STATE_TAG_RE.sub(" ", name.upper())
+    tokens = [
+        token
+        for token in _NON_ALPHANUMERIC_RE.sub(" ", name).split()
+        if token not in _SUFFIXES
+    ]
+    return " ".join(tokens)
+
+
+def _trigrams(normalized_name: str) -> Set[str]:
+    padded = f"  {normalized_name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyNameIndex:
+    def __init__(self):
+        """
+        Create an empty company name index; populate it with `add`
+        """
+        # one entry per distinct (normalized name, CIK)
+        self._entry_ids: Dict[Tuple[str, str], int] = {}
+        self._entries: List[Tuple[str, str]] = []
+        self._entry_trigram_counts: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, companies: Iterable[str], ciks: Iterable[str]):
+        """
+        Add company names to the index. Names already indexed for a CIK are ignored.
+
+        Args:
+            companies (Iterable[str]): Company names, as listed in the EDGAR index
+            ciks (Iterable[str]): CIK codes, matched up with `companies`
+        """
+        for company, cik in zip(companies, ciks):
+            normalized_name = normalize_name(company)
+            key = (normalized_name, cik)
+            if key in self._entry_ids:
+                continue
+
+            entry_id = len(self._entries)
+            self._entry_ids[key] = entry_id
+            self._entries.append((company, cik))
+
+            trigrams = _trigrams(normalized_name)
+            self._entry_trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, []).append(entry_id)
+
+    def search(
+        self, name: str, limit: int = 10, min_score: float = 0.3
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Find the companies whose names best match `name`
+
+        Args:
+            name (str): (Partial) company name to look for
+            limit (int, optional): Maximum number of matches to return. Defaults to 10.
+            min_score (float, optional):
+                Minimum similarity (0-1, trigram Jaccard) for a match. Defaults to 0.3.
+
+        Returns:
+            List[Tuple[str, str, float]]: (cik, company, score), best match first
+        """
+        normalized_name = normalize_name(name)
+        query_trigrams = _trigrams(normalized_name)
+
+        overlaps = Counter()
+        for trigram in query_trigrams:
+            overlaps.update(self._postings.get(trigram, ()))
+
+        n_query = len(query_trigrams)
+        best_by_cik: Dict[str, Tuple[float, str]] = {}
+        for entry_id, overlap in overlaps.items():
+            n_entry = self._entry_trigram_counts[entry_id]
+            score = overlap / (n_query + n_entry - overlap)
+            if score < min_score:
+                continue
+
+            company, cik = self._entries[entry_id]
+            if cik not in best_by_cik or score > best_by_cik[cik][0]:
+                best_by_cik[cik] = (score, company)
+
+        matches = [
+            (cik, company, score) for cik, (score, company) in best_by_cik.items()
+        ]
+        matches.sort(key=lambda match: (-match[2], match[1]))
+        return matches[:limit]
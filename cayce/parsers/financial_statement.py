@@ -1,17 +1,44 @@
+from collections import OrderedDict
 import datetime as dt
+import hashlib
 import logging
+from os import path
 import re
-from typing import Tuple
+import sys
+from typing import Any, Dict, List, Optional, Tuple
 
 from lxml import etree
 from lxml.etree import Element
+import numpy as np
 import pandas as pd
 
 from cayce.log import get_logger
 
-
 _LOG = get_logger(__name__, console_level=logging.ERROR)
 
+_XLINK = "{http://www.w3.org/1999/xlink}"
+_COVER_PAGE_FACTS = {
+    "EntityCentralIndexKey",
+    "EntityRegistrantName",
+    "DocumentType",
+    "DocumentPeriodEndDate",
+    "DocumentFiscalYearFocus",
+    "DocumentFiscalPeriodFocus",
+    "CurrentFiscalYearEndDate",
+    "EntityCommonStockSharesOutstanding",
+}
+# {company}_{form_type}_{yyyymmdd}_{accession}, as written by `EdgarIndex.download_xbrl`
+# (older versions only kept the last part of the accession number)
+_DOWNLOAD_FILE_RE = re.compile(r"^.+_.+_(\d{8})_(?:(\d{10}-\d{2}-\d{6})|[^_]+)\.\w+$")
+_STANDARD_LABEL_ROLE = "label"
+
+# The most recently parsed linkbases, keyed by a digest of their content, so that reading
+# the same filing's linkbases again (eg `parse` with labels, then `parse_statements`) doesn't
+# parse them twice. Each filing ships its own linkbases, and filers word the labels of even
+# us-gaap concepts their own way, so this is not shared between filings.
+_linkbase_cache: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+_LINKBASE_CACHE_SIZE = 256
+
 
 def _strip_ns(tag: str) -> str:
     """Remove namespace information from an XML tag"""
@@ -126,55 +153,423 @@ def _parse_attribute(element: Element):
     return context_id, attribute_name, value, unit_id
 
 
-def parse(file_name: str) -> pd.DataFrame:
+def linkbase_file_name(file_name: str, kind: str) -> str:
+    """
+    Local file name of a linkbase (kind is one of cal, pre or lab)
+    stored alongside the instance document `file_name`
+    """
+    return f"{path.splitext(file_name)[0]}.{kind}.xml"
+
+
+def is_linkbase_file(file_name: str) -> bool:
+    """Is this a linkbase, as opposed to an instance document?"""
+    return any(file_name.endswith(f".{kind}.xml") for kind in ["cal", "pre", "lab"])
+
+
+def _concept_from_href(href: str) -> str:
+    """
+    Turn a locator href like http://xbrl.fasb.org/.../us-gaap-2020-01-31.xsd#us-gaap_Assets
+    into the concept name (Assets) used by instance documents
+    """
+    concept_id = href.partition("#")[2]
+    return concept_id.split("_", 1)[-1]
+
+
+def _locators(extended_link: Element) -> Dict[str, str]:
+    """Map xlink:label -> concept for every locator in an extended link"""
+    locators = {}
+    for element in extended_link:
+        if isinstance(element.tag, str) and _strip_ns(element.tag) == "loc":
+            locators[element.get(_XLINK + "label")] = _concept_from_href(
+                element.get(_XLINK + "href", "")
+            )
+    return locators
+
+
+def _parse_label_linkbase(root: Element) -> Dict[str, Dict[str, str]]:
+    """
+    Parse a label linkbase
+
+    Returns:
+        Dict[str, Dict[str, str]]: concept -> label role (eg label, terseLabel) -> label
+    """
+    labels = {}
+    for extended_link in root:
+        if not isinstance(extended_link.tag, str):
+            continue
+        locators = _locators(extended_link)
+        resources = {}
+        arcs = []
+        for element in extended_link:
+            if not isinstance(element.tag, str):
+                continue
+            tag = _strip_ns(element.tag)
+            if tag == "label" and element.text is not None:
+                role = element.get(_XLINK + "role", _STANDARD_LABEL_ROLE)
+                resources.setdefault(element.get(_XLINK + "label"), []).append(
+                    (role.rsplit("/", 1)[-1], sys.intern(element.text.strip()))
+                )
+            elif tag == "labelArc":
+                arcs.append((element.get(_XLINK + "from"), element.get(_XLINK + "to")))
+
+        for from_label, to_label in arcs:
+            if from_label not in locators:
+                continue
+            concept = locators[from_label]
+            for role, label in resources.get(to_label, []):
+                labels.setdefault(concept, {})[role] = label
+    return labels
+
+
+def _parse_relationship_linkbase(
+    root: Element,
+) -> List[Tuple[str, str, str, float, Optional[float]]]:
+    """
+    Parse a presentation or calculation linkbase
+
+    Returns:
+        List[Tuple[str, str, str, float, Optional[float]]]:
+            (statement, parent concept, child concept, order, weight) for each arc.
+            Statements are named after the last part of their role URI
+    """
+    relationships = []
+    for extended_link in root:
+        if not isinstance(extended_link.tag, str):
+            continue
+        statement = extended_link.get(_XLINK + "role", "").rsplit("/", 1)[-1]
+        locators = _locators(extended_link)
+        for element in extended_link:
+            if not isinstance(element.tag, str) or not _strip_ns(element.tag).endswith(
+                "Arc"
+            ):
+                continue
+            from_label = element.get(_XLINK + "from")
+            to_label = element.get(_XLINK + "to")
+            if from_label not in locators or to_label not in locators:
+                continue
+            weight = element.get("weight")
+            relationships.append(
+                (
+                    statement,
+                    locators[from_label],
+                    locators[to_label],
+                    float(element.get("order", 0)),
+                    float(weight) if weight is not None else None,
+                )
+            )
+    return relationships
+
+
+def _load_linkbase(file_name: str, kind: str):
+    """
+    Parse the `kind` (cal, pre or lab) linkbase stored next to the instance document `file_name`,
+    reusing the result if the same linkbase was parsed recently. Returns None if there is no such linkbase.
+    """
+    linkbase_file = linkbase_file_name(file_name, kind)
+    if not path.exists(linkbase_file):
+        return None
+
+    with open(linkbase_file, "rb") as f:
+        content = f.read()
+    key = (kind, hashlib.sha1(content).hexdigest())
+    if key in _linkbase_cache:
+        _linkbase_cache.move_to_end(key)
+        return _linkbase_cache[key]
+
+    root = etree.fromstring(content, etree.XMLParser(recover=True))
+    if root is None:
+        linkbase = None
+    elif kind == "lab":
+        linkbase = _parse_label_linkbase(root)
+    else:
+        linkbase = _parse_relationship_linkbase(root)
+
+    _linkbase_cache[key] = linkbase
+    if len(_linkbase_cache) > _LINKBASE_CACHE_SIZE:
+        _linkbase_cache.popitem(last=False)
+    return linkbase
+
+
+def _get_label(
+    labels: Dict[str, Dict[str, str]], concept: str, role: str = _STANDARD_LABEL_ROLE
+) -> Optional[str]:
+    """Find the label for a concept, falling back to its standard label"""
+    concept_labels = labels.get(concept, {})
+    return concept_labels.get(role) or concept_labels.get(_STANDARD_LABEL_ROLE)
+
+
+def parse_statements(file_name: str) -> pd.DataFrame:
+    """
+    Resolve the presentation, calculation and label linkbases stored alongside
+    a financial statement into the structure of each statement
+
+    Args:
+        file_name (str): Local file name for XBLR financial statement
+
+    Returns:
+        pd.DataFrame:
+            One row per concept per statement, in presentation order, with its label,
+            presentation parent and depth, plus its calculation parent and weight (if any)
+    """
+    presentation = _load_linkbase(file_name, "pre") or []
+    calculation = _load_linkbase(file_name, "cal") or []
+    labels = _load_linkbase(file_name, "lab") or {}
+
+    calculation_parents = {}
+    for statement, parent, child, _, weight in calculation:
+        calculation_parents[(statement, child)] = (parent, weight)
+        calculation_parents.setdefault((None, child), (parent, weight))
+
+    children = {}
+    for statement, parent, child, order, _ in presentation:
+        children.setdefault(statement, {}).setdefault(parent, []).append((order, child))
+
+    rows = []
+
+    def _walk(statement: str, parent: Optional[str], concept: str, depth: int):
+        calculation_parent, weight = calculation_parents.get(
+            (statement, concept), calculation_parents.get((None, concept), (None, None))
+        )
+        rows.append(
+            (
+                statement,
+                concept,
+                _get_label(labels, concept),
+                parent,
+                depth,
+                calculation_parent,
+                weight,
+            )
+        )
+        for _, child in sorted(children[statement].get(concept, [])):
+            _walk(statement, concept, child, depth + 1)
+
+    for statement, statement_children in children.items():
+        all_children = {
+            child for siblings in statement_children.values() for _, child in siblings
+        }
+        for root in statement_children:
+            if root not in all_children:
+                _walk(statement, None, root, 0)
+
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "statement",
+            "attribute_name",
+            "label",
+            "parent",
+            "depth",
+            "calculation_parent",
+            "weight",
+        ],
+    )
+
+
+class _StatementBuffer:
+    """
+    Column buffers for the attributes of a financial statement,
+    with contexts and units held as lookup tables until the output is built
+    """
+
+    def __init__(self):
+        # context_id -> (period_start, period_end)
+        self.contexts: Dict[str, Tuple[Optional[dt.date], dt.date]] = {}
+        # unit_id -> unit
+        self.units: Dict[str, str] = {}
+        self.context_ids: List[str] = []
+        self.attribute_names: List[str] = []
+        self.attribute_values: List[object] = []
+        self.unit_ids: List[Optional[str]] = []
+
+    def add_context(self, context: Optional[Tuple[str, dt.date, dt.date]]):
+        if context is not None:
+            context_id, period_start, period_end = context
+            self.contexts.setdefault(context_id, (period_start, period_end))
+
+    def add_unit(self, unit: Optional[Tuple[str, str]]):
+        if unit is not None:
+            unit_id, measure = unit
+            self.units.setdefault(unit_id, measure)
+
+    def add_attribute(self, attribute: Optional[Tuple[str, str, object, str]]):
+        if attribute is not None:
+            context_id, attribute_name, value, unit_id = attribute
+            self.context_ids.append(context_id)
+            self.attribute_names.append(attribute_name)
+            self.attribute_values.append(value)
+            self.unit_ids.append(unit_id)
+
+    def to_frame(self, file_name: str, with_labels: bool = False) -> pd.DataFrame:
+        """
+        Join attributes up with their contexts and units, into the output of `parse`.
+        Attributes whose context was ignored (or never defined) are dropped.
+        Rows are grouped by context, in the order each context is first used.
+        """
+        context_order = {}
+        for context_id in self.context_ids:
+            if context_id in self.contexts:
+                context_order.setdefault(context_id, len(context_order))
+        rows = sorted(
+            (
+                i
+                for i, context_id in enumerate(self.context_ids)
+                if context_id in context_order
+            ),
+            key=lambda i: context_order[self.context_ids[i]],
+        )
+
+        n_rows = len(rows)
+        period_starts = np.empty(n_rows, dtype=object)
+        period_ends = np.empty(n_rows, dtype=object)
+        attribute_names = np.empty(n_rows, dtype=object)
+        attribute_values = np.empty(n_rows, dtype=object)
+        units = np.empty(n_rows, dtype=object)
+        for row, i in enumerate(rows):
+            period_starts[row], period_ends[row] = self.contexts[self.context_ids[i]]
+            attribute_names[row] = self.attribute_names[i]
+            attribute_values[row] = self.attribute_values[i]
+            units[row] = self.units.get(self.unit_ids[i])
+
+        columns = {
+            "period_start": period_starts,
+            "period_end": period_ends,
+            "attribute_name": attribute_names,
+            "attribute_value": attribute_values,
+            "unit": units,
+        }
+        if with_labels:
+            labels = _load_linkbase(file_name, "lab") or {}
+            columns["label"] = np.array(
+                [
+                    _get_label(labels, attribute_name)
+                    for attribute_name in attribute_names
+                ],
+                dtype=object,
+            )
+        return pd.DataFrame(columns, columns=list(columns))
+
+
+def cover_page(statement_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Pull the dei cover page facts (fiscal period, shares outstanding, etc)
+    out of a parsed financial statement
+
+    Args:
+        statement_df (pd.DataFrame): Output of `parse` (or `inline_xbrl.parse`)
+
+    Returns:
+        Dict[str, Any]:
+            cik, company, form_type, period_end, fiscal_year, fiscal_period,
+            fiscal_year_end (eg --06-30) and shares_outstanding; None for any the filing doesn't report
+    """
+    facts = {}
+    for attribute_name, value, period_end in zip(
+        statement_df["attribute_name"],
+        statement_df["attribute_value"],
+        statement_df["period_end"],
+    ):
+        if attribute_name in _COVER_PAGE_FACTS:
+            # keep the first; multi-class filers report shares outstanding per class (segment),
+            # which `parse` has already dropped
+            facts.setdefault(attribute_name, (value, period_end))
+
+    def _fact(attribute_name: str):
+        return facts.get(attribute_name, (None, None))[0]
+
+    def _int(value) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    cik = _int(_fact("EntityCentralIndexKey"))
+    period_end = _fact("DocumentPeriodEndDate")
+    try:
+        period_end = dt.date.fromisoformat(str(period_end)[:10])
+    except ValueError:
+        # older filings leave it out; the document's own context ends on the same day
+        period_end = facts.get("DocumentType", (None, None))[1]
+    shares_outstanding = _fact("EntityCommonStockSharesOutstanding")
+
+    return {
+        "cik": str(cik) if cik is not None else None,
+        "company": _fact("EntityRegistrantName"),
+        "form_type": _fact("DocumentType"),
+        "period_end": period_end,
+        "fiscal_year": _int(_fact("DocumentFiscalYearFocus")),
+        "fiscal_period": _fact("DocumentFiscalPeriodFocus"),
+        "fiscal_year_end": _fact("CurrentFiscalYearEndDate"),
+        "shares_outstanding": (
+            float(shares_outstanding)
+            if isinstance(shares_outstanding, (int, float))
+            else None
+        ),
+    }
+
+
+def _date_filed(file_name: str) -> Optional[dt.date]:
+    """Date filed, from a file name generated by `EdgarIndex.download_xbrl`, if it is one"""
+    match = _DOWNLOAD_FILE_RE.match(path.basename(file_name))
+    return dt.datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def _accession(file_name: str) -> Optional[str]:
+    """Accession number, from a file name generated by `EdgarIndex.download_xbrl`, if it has one"""
+    match = _DOWNLOAD_FILE_RE.match(path.basename(file_name))
+    return match.group(2) if match else None
+
+
+def _record_cover_page(
+    file_name: str, statement_df: pd.DataFrame, metadata_index, accession: str
+):
+    """Add a parsed statement's cover page to `metadata_index`, if there is one"""
+    if metadata_index is None:
+        return
+    accession = accession or _accession(file_name)
+    if accession is None:
+        raise ValueError("An accession number is needed to record the cover page")
+    metadata_index.add(accession, cover_page(statement_df), _date_filed(file_name))
+
+
+def parse(
+    file_name: str,
+    with_labels: bool = False,
+    metadata_index=None,
+    accession: str = None,
+) -> pd.DataFrame:
     """
     Parse all attributes from a financial statement (10-K and 10-Q only)
     and return as a DataFrame
 
     Args:
         file_name (str): Local file name for XBLR financial statement
+        with_labels (bool, optional):
+            Add a label column, taken from the label linkbase stored alongside the
+            statement. Defaults to False.
+        metadata_index (FilingMetadataIndex, optional):
+            Also record the statement's cover page (see `cover_page`) in this index,
+            for screening filings later without parsing them again. Defaults to None.
+        accession (str, optional):
+            Accession number of the filing (eg 0000320193-20-000096), for `metadata_index`.
+            Defaults to None, which takes it from the name `EdgarIndex.download_xbrl` gave the file.
     """
     parser = etree.XMLParser(recover=True)
     doc = etree.parse(file_name, parser)
 
-    units = []
-    contexts = []
-    attributes = []
+    buffer = _StatementBuffer()
     for child in doc.getroot():
         # some xblr docs have a tag that is interpretted as a cython comment function
         if isinstance(child.tag, str):
             tag = _strip_ns(child.tag).lower()
             if tag == "unit":
-                unit = _parse_unit(child)
-                if unit is not None:
-                    units.append(unit)
+                buffer.add_unit(_parse_unit(child))
             elif tag == "context":
-                context = _parse_context(child)
-                if context is not None:
-                    contexts.append(context)
+                buffer.add_context(_parse_context(child))
             else:
                 # assume its some type of attribute
-                attribute = _parse_attribute(child)
-                if attribute is not None:
-                    attributes.append(attribute)
-
-    units_df = pd.DataFrame(units, columns=["unit_id", "unit"])
-    contexts_df = pd.DataFrame(
-        contexts, columns=["context_id", "period_start", "period_end"]
-    )
-    attributes_df = pd.DataFrame(
-        attributes,
-        columns=["context_id", "attribute_name", "attribute_value", "unit_id"],
-    )
+                buffer.add_attribute(_parse_attribute(child))
 
-    statement_df = attributes_df.merge(contexts_df).merge(units_df, how="left")
-    statement_df.loc[pd.isna(statement_df["unit"]), "unit"] = None
-
-    output_columns = [
-        "period_start",
-        "period_end",
-        "attribute_name",
-        "attribute_value",
-        "unit",
-    ]
-    return statement_df[output_columns]
+    statement_df = buffer.to_frame(file_name, with_labels)
+    _record_cover_page(file_name, statement_df, metadata_index, accession)
+    return statement_df
@@ -5,11 +5,11 @@ from typing import Tuple
 
 from lxml import etree
 from lxml.etree import Element
+import numpy as np
 import pandas as pd
 
 from cayce.log import get_logger
 
-
 _LOG = get_logger(__name__, console_level=logging.ERROR)
 
 
@@ -37,24 +37,31 @@ def _parse_owner(owner_element: Element):
     return owner_name, is_director, is_officer, istenpercentowner, isother
 
 
-def _parse_transaction(transaction_element: Element):
-    def _get_string(element: Element) -> str:
-        for child in element:
-            tag = child.tag.lower()
-            if tag == "value":
-                return child.text
-        _LOG.info(f"{element.tag} had no value")
-        return None
-
-    def _get_float(element: Element) -> float:
-        value = _get_string(element)
-        return float(value) if value is not None else None
+def _get_string(element: Element) -> str:
+    for child in element:
+        tag = child.tag.lower()
+        if tag == "value":
+            return child.text
+    _LOG.info(f"{element.tag} had no value")
+    return None
+
+
+def _get_float(element: Element) -> float:
+    value = _get_string(element)
+    return float(value) if value is not None else None
+
 
+def _parse_transaction(transaction_element: Element):
+    transaction_code = None
     for child in transaction_element:
         tag = child.tag.lower()
         if tag == "transactiondate":
-            transaction_date = _get_string(child)
-            transaction_date = dt.datetime.strptime(transaction_date, "%Y-%m-%d").date()
+            transaction_date = dt.date.fromisoformat(_get_string(child)[:10])
+        elif tag == "transactioncoding":
+            for elem in child:
+                # eg P (open market purchase), S (sale), A (grant or award), M (option exercise)
+                if elem.tag.lower() == "transactioncode":
+                    transaction_code = (elem.text or "").strip() or None
         elif tag == "transactionamounts":
             for elem in child:
                 attribute_tag = elem.tag.lower()
@@ -75,6 +82,7 @@ def _parse_transaction(transaction_element: Element):
         transaction_shares * trade_direction,
         price,
         post_transaction_shares,
+        transaction_code,
     )
 
 
@@ -82,11 +90,16 @@ def parse(file_name: str) -> pd.DataFrame:
     parser = etree.XMLParser(recover=True)
     doc = etree.parse(file_name, parser)
 
-    transactions = []
+    # one list per column, so the frame is built in one go rather than row by row
+    transaction_dates = []
+    shares = []
+    prices = []
+    post_transaction_shares = []
+    transaction_codes = []
     for child in doc.getroot():
         tag = child.tag.lower()
         if tag == "periodofreport":
-            report_date = dt.datetime.strptime(child.text, "%Y-%m-%d").date()
+            report_date = dt.date.fromisoformat(child.text[:10])
         elif tag == "issuer":
             for elem in child:
                 if elem.tag.lower() == "issuertradingsymbol":
@@ -96,17 +109,28 @@ def parse(file_name: str) -> pd.DataFrame:
         elif tag == "nonderivativetable":
             for elem in child:
                 if elem.tag.lower() == "nonderivativetransaction":
-                    transactions.append(_parse_transaction(elem))
-
-    form4_df = pd.DataFrame(
-        transactions,
-        columns=["transaction_date", "shares", "price", "post_transaction_shares"],
-    )
-    form4_df["report_date"] = report_date
-    form4_df["ticker"] = ticker
-
+                    transaction = _parse_transaction(elem)
+                    transaction_dates.append(transaction[0])
+                    shares.append(transaction[1])
+                    prices.append(transaction[2])
+                    post_transaction_shares.append(transaction[3])
+                    transaction_codes.append(transaction[4])
+
+    n_transactions = len(transaction_dates)
+    columns = {
+        "transaction_date": np.array(transaction_dates, dtype=object),
+        # missing prices (eg gifts) become NaN
+        "shares": np.array(shares, dtype=float),
+        "price": np.array(prices, dtype=float),
+        "post_transaction_shares": np.array(post_transaction_shares, dtype=float),
+        "transaction_code": np.array(transaction_codes, dtype=object),
+        "report_date": np.full(n_transactions, report_date, dtype=object),
+        "ticker": np.full(n_transactions, ticker, dtype=object),
+    }
     attribute_columns = ["owner", "director", "officer", "tenpercentowner", "other"]
-    for attribute, value in zip(attribute_columns, owner_details,):
-        form4_df[attribute] = value
+    for attribute, value in zip(attribute_columns, owner_details):
+        columns[attribute] = np.full(
+            n_transactions, value, dtype=bool if isinstance(value, bool) else object
+        )
 
-    return form4_df
+    return pd.DataFrame(columns, columns=list(columns))
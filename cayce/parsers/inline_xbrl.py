@@ -0,0 +1,231 @@
+"""
+Parse inline XBRL (iXBRL), ie facts tagged directly inside the HTML primary document
+of a 10-K or 10-Q, which is how most filers have submitted since 2019
+
+The document is streamed rather than loaded whole, since primary documents
+can run to tens of megabytes of HTML around a few thousand facts.
+"""
+
+from decimal import Decimal, InvalidOperation
+import datetime as dt
+import logging
+import re
+from typing import Optional, Tuple
+
+from lxml import etree
+from lxml.etree import Element
+import pandas as pd
+
+from cayce.log import get_logger
+from cayce.parsers.financial_statement import (
+    _StatementBuffer,
+    _parse_context,
+    _record_cover_page,
+    _parse_unit,
+    _strip_ns,
+)
+
+_LOG = get_logger(__name__, console_level=logging.ERROR)
+
+_XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+
+# ixt / ixt-sec transformation names (both the 2010-2015 and the hyphenated 2020 spellings)
+# that tell us how to read the displayed number back into a plain decimal;
+# anything else is read as num-dot-decimal
+_COMMA_DECIMAL_FORMATS = {
+    "numcommadecimal",
+    "num-comma-decimal",
+    "numdotcomma",
+    "numspacecomma",
+}
+# whole units, a unit name, then the fractional part, eg "1,23,456 rupees 78 paise";
+# the *in spellings group the whole units the Indian way (lakhs and crores)
+_UNIT_DECIMAL_FORMATS = {
+    "numunitdecimal",
+    "num-unit-decimal",
+    "numunitdecimalin",
+    "num-unit-decimal-in",
+}
+_UNIT_DECIMAL_RE = re.compile(r"^([\d,.\s]*\d)(?:\D+(\d+))?\D*$")
+_ZERO_FORMATS = {"zerodash", "fixed-zero", "fixedzero", "numdash"}
+_ZERO_WORDS = {"no", "none", "nil", "zero"}
+_NON_NUMERIC_RE = re.compile(r"[^\d.]")
+
+# date transformations -> (strptime formats to try, output format)
+_DATE_FORMATS = {
+    "datemonthdayyearen": (["%B %d, %Y", "%B %d %Y", "%b %d, %Y"], "%Y-%m-%d"),
+    "date-monthname-day-year-en": (["%B %d, %Y", "%B %d %Y", "%b %d, %Y"], "%Y-%m-%d"),
+    "datedaymonthyearen": (["%d %B %Y", "%d %b %Y"], "%Y-%m-%d"),
+    "date-day-monthname-year-en": (["%d %B %Y", "%d %b %Y"], "%Y-%m-%d"),
+    "dateslashus": (["%m/%d/%Y", "%m/%d/%y"], "%Y-%m-%d"),
+    "date-month-day-year": (["%m/%d/%Y", "%m/%d/%y"], "%Y-%m-%d"),
+    "datemonthdayen": (["%B %d", "%b %d"], "--%m-%d"),
+    "date-monthname-day-en": (["%B %d", "%b %d"], "--%m-%d"),
+}
+
+
+def _is_inline_tag(element: Element, local_name: str) -> bool:
+    """Is this element ix:{local_name} (for any version of the inline XBRL namespace)?"""
+    return "inlineXBRL}" in element.tag and _strip_ns(element.tag) == local_name
+
+
+def _text_content(element: Element) -> str:
+    """All text displayed within an element, leaving out anything in an ix:exclude"""
+    parts = [element.text or ""]
+    for child in element:
+        if isinstance(child.tag, str) and not _is_inline_tag(child, "exclude"):
+            parts.append(_text_content(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _format_name(element: Element) -> str:
+    """Local part of the format attribute, eg ixt:num-dot-decimal -> num-dot-decimal"""
+    return element.get("format", "").split(":")[-1].lower()
+
+
+def _parse_number(element: Element) -> Optional[float]:
+    """
+    Read the value of an ix:nonFraction, applying its format transformation,
+    scale (power of 10 the displayed number is in) and sign
+    """
+    text = _text_content(element).strip()
+    format_name = _format_name(element)
+
+    if format_name in _ZERO_FORMATS or text.lower() in _ZERO_WORDS:
+        digits = "0"
+    elif format_name in _COMMA_DECIMAL_FORMATS:
+        digits = _NON_NUMERIC_RE.sub("", text.replace(".", "").replace(",", "."))
+    elif format_name in _UNIT_DECIMAL_FORMATS:
+        match = _UNIT_DECIMAL_RE.match(text)
+        digits = (
+            f"{re.sub(r'[^0-9]', '', match.group(1))}.{match.group(2) or '0'}"
+            if match
+            else text
+        )
+    else:
+        digits = _NON_NUMERIC_RE.sub("", text)
+
+    try:
+        value = Decimal(digits).scaleb(int(element.get("scale", 0)))
+    except (InvalidOperation, ValueError):
+        _LOG.warning(f"Ignoring attribute {element.get('name')}; can't read {text!r}")
+        return None
+
+    if element.get("sign") == "-":
+        value = -value
+    return float(value)
+
+
+def _parse_non_numeric(element: Element):
+    """Read the value of an ix:nonNumeric, applying date transformations"""
+    text = " ".join(_text_content(element).split())
+    format_name = _format_name(element)
+    if format_name in _DATE_FORMATS:
+        input_formats, output_format = _DATE_FORMATS[format_name]
+        for input_format in input_formats:
+            try:
+                return dt.datetime.strptime(text, input_format).strftime(output_format)
+            except ValueError:
+                continue
+        _LOG.warning(f"Couldn't read {text!r} as {format_name}")
+    elif format_name in ["booleantrue", "fixed-true"]:
+        return "true"
+    elif format_name in ["booleanfalse", "fixed-false"]:
+        return "false"
+    # same treatment as a plain XBRL instance document
+    return float(text) if text.isnumeric() else text
+
+
+def _parse_fact(element: Element) -> Optional[Tuple[str, str, object, str]]:
+    """
+    Take an ix:nonFraction or ix:nonNumeric element and pull out the
+    attribute name, context, value, and unit (if applicable)
+    """
+    if "contextRef" not in element.attrib or element.get(_XSI_NIL) == "true":
+        _LOG.warning(
+            f"Ignoring attribute {element.get('name')}; has no context or value"
+        )
+        return None
+
+    attribute_name = element.get("name", "").split(":")[-1]
+    if _is_inline_tag(element, "nonFraction"):
+        value = _parse_number(element)
+        if value is None:
+            return None
+    else:
+        value = _parse_non_numeric(element)
+
+    unit_id = element.get("unitRef")
+    return (
+        element.get("contextRef"),
+        attribute_name,
+        value,
+        unit_id.upper() if unit_id is not None else None,
+    )
+
+
+def parse(
+    file_name: str,
+    with_labels: bool = False,
+    metadata_index=None,
+    accession: str = None,
+) -> pd.DataFrame:
+    """
+    Parse all tagged facts from an inline XBRL financial statement (10-K and 10-Q only)
+    and return as a DataFrame, in the same form as `financial_statement.parse`
+
+    Text blocks split over several ix:continuation elements only keep their first part.
+
+    Args:
+        file_name (str): Local file name for the iXBRL (HTML) primary document
+        with_labels (bool, optional):
+            Add a label column, taken from the label linkbase stored alongside the
+            statement. Defaults to False.
+        metadata_index (FilingMetadataIndex, optional):
+            Also record the statement's cover page in this index. Defaults to None.
+        accession (str, optional):
+            Accession number of the filing, for `metadata_index`. Defaults to None,
+            which takes it from the name `EdgarIndex.download_xbrl` gave the file.
+    """
+    buffer = _StatementBuffer()
+    # the same fact is often tagged everywhere it's displayed, so keep the first of each
+    attributes = {}
+    # facts can nest (eg a number tagged inside a tagged text block), so nothing under
+    # an open fact, context or unit can be thrown away until the outer element is read
+    open_elements = 0
+    for event, element in etree.iterparse(
+        file_name, events=("start", "end"), recover=True, huge_tree=True
+    ):
+        if not isinstance(element.tag, str):
+            continue
+
+        tag = _strip_ns(element.tag)
+        is_fact = _is_inline_tag(element, "nonFraction") or _is_inline_tag(
+            element, "nonNumeric"
+        )
+        if is_fact or tag == "context" or tag == "unit":
+            open_elements += 1 if event == "start" else -1
+        if event == "start":
+            continue
+
+        if is_fact:
+            attribute = _parse_fact(element)
+            if attribute is not None:
+                attributes.setdefault(attribute)
+        elif tag == "context":
+            buffer.add_context(_parse_context(element))
+        elif tag == "unit":
+            buffer.add_unit(_parse_unit(element))
+
+        if open_elements == 0:
+            # done with this part of the document; keep memory flat
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    for attribute in attributes:
+        buffer.add_attribute(attribute)
+    statement_df = buffer.to_frame(file_name, with_labels)
+    _record_cover_page(file_name, statement_df, metadata_index, accession)
+    return statement_df
@@ -2,92 +2,438 @@
 Query for available documents directly from EDGAR
 """
 
+from __future__ import annotations
+
 import datetime as dt
-from os import path, remove
+from os import makedirs, path, remove
 import re
-import requests
 import shutil
 import tempfile
-from typing import Union, List, Any
-from zipfile import ZipFile
-
-import pandas as pd
+import threading
+from typing import Union, List, Any, Dict, NamedTuple, Optional, Tuple
 
 from cayce.utils import (
+    lazy_import,
+    atomic_write,
     ifna,
     split_fixed_length,
-    add_months,
     get_quarter,
+    get_quarters,
     get_start_of_quarter,
+    get_end_of_quarter,
 )
 from cayce.log import get_logger
+from cayce.names import CompanyNameIndex
+from cayce import web
+
+# these are comparatively expensive to import, and plenty of entry points
+# (cik lookups, a single download) never touch them
+pd = lazy_import("pandas")
+zipfile = lazy_import("zipfile")
 
 
 _LOG = get_logger(__name__)
 
+_INDEX_COLUMNS = ["company", "form_type", "cik", "date_filed", "file_name"]
+# eg edgar/data/320193/0000320193-20-000096.txt
+_FILE_NAME_RE = r"^edgar/data/\d+/(\d{10})-(\d{2})-(\d{6})\.txt$"
+# the same, split into CIK and accession number
+_SUBMISSION_RE = r"^edgar/data/(\d+)/(\d{10}-\d{2}-\d{6})\.txt$"
+# rows of the index turned back into strings at a time, when saving it
+_FLUSH_BATCH_ROWS = 100_000
+
+
+def _compact_index(index_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert index rows, as parsed from EDGAR (all strings), into a compact form:
+    dictionary encoded company and form type, integer CIK and the file name
+    reduced to its accession number (also stored as an integer)
+
+    The odd file name that doesn't follow the usual layout is kept as it is, in a
+    dictionary encoded file_name column that is missing for every other row.
+    """
+    accession_parts = index_df["file_name"].str.extract(_FILE_NAME_RE)
+    unrecognized = accession_parts[0].isna()
+
+    return pd.DataFrame(
+        {
+            "company": index_df["company"].astype("category"),
+            "form_type": index_df["form_type"].astype("category"),
+            "cik": index_df["cik"].astype("int64"),
+            "date_filed": pd.to_datetime(index_df["date_filed"]),
+            "accession": (accession_parts[0] + accession_parts[1] + accession_parts[2])
+            .fillna("0")
+            .astype("int64"),
+            "file_name": index_df["file_name"].where(unrecognized).astype("category"),
+        }
+    ).reset_index(drop=True)
+
+
+def _parse_ciks(ciks: List[str]) -> List[int]:
+    """
+    CIK values, as stored by `_compact_index`; one that isn't a number
+    can't belong to any filing, so it is left out rather than rejected
+    """
+    parsed = []
+    for cik in ciks:
+        try:
+            parsed.append(int(cik))
+        except (TypeError, ValueError):
+            _LOG.warning(f"Ignoring CIK {cik!r}, which isn't a number")
+    return parsed
+
+
+def _concat_index(compact_dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate chunks in the form of `_compact_index`; each chunk has its own dictionary
+    of companies, form types and file names, so these are merged rather than decoded back into strings
+    """
+    from pandas.api.types import union_categoricals
+
+    return pd.DataFrame(
+        {
+            column: (
+                union_categoricals(
+                    [compact_df[column] for compact_df in compact_dfs],
+                    ignore_order=True,
+                )
+                if column in ["company", "form_type", "file_name"]
+                else pd.concat(
+                    [compact_df[column] for compact_df in compact_dfs],
+                    ignore_index=True,
+                )
+            )
+            for column in compact_dfs[0].columns
+        }
+    )
+
+
+def _expand_index(compact_df: pd.DataFrame) -> pd.DataFrame:
+    """Reverse `_compact_index`, restoring the columns as listed by EDGAR"""
+    cik = compact_df["cik"].astype(str)
+    accession = compact_df["accession"].astype(str).str.zfill(18)
+    file_name = (
+        "edgar/data/"
+        + cik
+        + "/"
+        + accession.str[:10]
+        + "-"
+        + accession.str[10:12]
+        + "-"
+        + accession.str[12:]
+        + ".txt"
+    )
+    file_name = file_name.where(
+        compact_df["file_name"].isna(), compact_df["file_name"].astype(object)
+    )
+    return pd.DataFrame(
+        {
+            "company": compact_df["company"].astype(str),
+            "form_type": compact_df["form_type"].astype(str),
+            "cik": cik,
+            "date_filed": compact_df["date_filed"],
+            "file_name": file_name,
+        },
+        columns=_INDEX_COLUMNS,
+    )
+
+
+def _parse_filing_index(content: bytes) -> List[Tuple[str, str, str, str]]:
+    """
+    List the documents on a filing's index page ({accession}-index.htm)
+
+    Returns:
+        List[Tuple[str, str, str, str]]: description, document name, link and type of each document
+    """
+    from lxml import html
+
+    documents = []
+    for row in html.fromstring(content).xpath(
+        "//table[contains(@class, 'tableFile')]//tr"
+    ):
+        cells = row.findall("td")
+        link = cells[2].find(".//a") if len(cells) >= 4 else None
+        if link is None:
+            continue
+
+        href = link.get("href", "")
+        # inline XBRL documents link to the viewer, eg /ix?doc=/Archives/edgar/data/...
+        if "?doc=" in href:
+            href = href.split("?doc=", 1)[1]
+        documents.append(
+            (
+                cells[1].text_content().strip(),
+                cells[2].text_content().strip(),
+                href,
+                cells[3].text_content().strip(),
+            )
+        )
+    return documents
+
+
+def _classify_document(
+    form_type: str, description: str, document: str, href: str, document_type: str
+) -> Optional[str]:
+    """
+    Work out which (if any) of the documents we keep from a filing this is,
+    matching the document kinds from `EdgarIndex._get_financial_statement_payloads`
+    """
+    document_type = document_type.upper()
+    if form_type == "4":
+        # the same document is also listed rendered by a stylesheet, eg xslF345X03/doc4.xml
+        if (
+            document_type == "4"
+            and href.lower().endswith(".xml")
+            and "/xsl" not in href.lower()
+        ):
+            return "PRIMARY"
+        return None
+
+    linkbase_match = re.match(r"^EX-101\.(CAL|PRE|LAB)$", document_type)
+    if linkbase_match:
+        return linkbase_match.group(1)
+    if (
+        document_type == "EX-101.INS"
+        or "XBRL INSTANCE" in description.upper()
+        or href.endswith("_htm.xml")
+    ):
+        return "INS"
+    if re.match(r"^10-[KQ](/A)?$", document_type) and "IXBRL" in document.upper():
+        return "IXBRL"
+    return None
 
-class EdgarIndex:
-    _index: pd.DataFrame = None
 
-    # tomorrow will be greater than the maximum allowable date
-    _min_date: dt.date = dt.date.today() + dt.timedelta(days=1)
-    # epoch is less than the minimum accepted date here
-    _max_date: dt.date = dt.datetime.fromtimestamp(0).date()
+class _Snapshot(NamedTuple):
+    """
+    An immutable view of the filing index. Refreshes publish a new snapshot
+    rather than modifying the current one, so readers never need a lock.
+    """
+
+    # compacted chunks (see `_compact_index`), so that adding new quarters
+    # never copies what's already loaded
+    chunks: Tuple[pd.DataFrame, ...]
+    # range of dates covered by the chunks
+    min_date: dt.date
+    max_date: dt.date
+
 
-    def __init__(self, cache_dir: str = None):
+def _open_quarter_start(snapshot: _Snapshot) -> dt.date:
+    """
+    Start of the earliest quarter that may be incomplete in a snapshot: the current one,
+    or the one it was last refreshed in, if that quarter hadn't ended by then
+    """
+    current_quarter_start = get_start_of_quarter(dt.date.today())
+    if snapshot.max_date < get_end_of_quarter(snapshot.max_date):
+        return min(get_start_of_quarter(snapshot.max_date), current_quarter_start)
+    return current_quarter_start
+
+
+def _reaches(chunk: pd.DataFrame, date: dt.date) -> bool:
+    """Whether a chunk of the index holds any filings from `date` on"""
+    return len(chunk) > 0 and chunk["date_filed"].max() >= pd.to_datetime(date)
+
+
+class EdgarIndex:
+    def __init__(self, cache_dir: str = None, auto_flush: bool = True):
         """
-        Create a new Edgar filing index
+        Create a new Edgar filing index.
+
+        One instance can be shared between threads: searches read an immutable snapshot
+        of the index, while refreshes are serialized and publish a new snapshot when done.
 
         Args:
-            cache_dir (str, optional): 
-                Local path where Edgar cache files can be stored. 
+            cache_dir (str, optional):
+                Local path where Edgar cache files can be stored.
                 Defaults to None, which will equates to %TEMP%
+            auto_flush (bool, optional):
+                Write the index to the cache directory whenever a refresh adds a completed quarter,
+                rather than only on `flush` or `close`. Defaults to True.
         """
         if cache_dir:
             self._use_temp = False
             self._cache_dir = cache_dir
             self._index_cache_file = path.join(self._cache_dir, "edgar_filings.idx")
-            if path.exists(self._index_cache_file):
-                # force everything to be used as a string
-                self._index = pd.read_csv(self._index_cache_file).astype(str)
-                # except for the filing date, of course...
-                self._index["date_filed"] = pd.to_datetime(self._index["date_filed"])
-                self._min_date = self._index["date_filed"].min()
-                self._max_date = self._index["date_filed"].max()
-
         else:
             self._use_temp = True
             self._cache_dir = tempfile.mkdtemp()
+        self._auto_flush = auto_flush
+
+        # held while changing the index; never needed to read it
+        self._lock = threading.RLock()
+        # reading the cached index is slow, so hold off until a search needs it
+        self._snapshot: Optional[_Snapshot] = None
+
+        # built on the first company name search, then kept up to date by each refresh
+        self._name_lock = threading.Lock()
+        self._name_index: CompanyNameIndex = None
+        # cover page facts of parsed filings, opened on first use
+        self._metadata = None
 
-        if self._index is None:
-            self._index = pd.DataFrame(
-                [], columns=["company", "form_type", "cik", "date_filed", "file_name"]
+    def _load_index(self) -> _Snapshot:
+        """
+        Load the cached filing index from disk, if we haven't done so already
+
+        Returns:
+            _Snapshot: The current state of the index
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+
+            # tomorrow will be greater than the maximum allowable date,
+            # and epoch is less than the minimum accepted date here
+            snapshot = _Snapshot(
+                (),
+                dt.date.today() + dt.timedelta(days=1),
+                dt.datetime.fromtimestamp(0).date(),
             )
+            if not self._use_temp and path.exists(self._index_cache_file):
+                cached_df = pd.read_csv(
+                    self._index_cache_file,
+                    dtype={
+                        "company": str,
+                        "form_type": str,
+                        "cik": str,
+                        "file_name": str,
+                    },
+                    keep_default_na=False,
+                )
+                chunk = _compact_index(cached_df)
+                del cached_df
+                # an empty cache file says nothing about which dates it covers
+                if len(chunk) > 0:
+                    # the cache only ever holds whole quarters
+                    snapshot = _Snapshot(
+                        (chunk,),
+                        get_start_of_quarter(chunk["date_filed"].min().date()),
+                        min(
+                            get_end_of_quarter(chunk["date_filed"].max().date()),
+                            dt.date.today(),
+                        ),
+                    )
+
+            self._snapshot = snapshot
+            return snapshot
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._load_index().chunks)
+
+    @property
+    def metadata(self) -> "FilingMetadataIndex":
+        """
+        Cover page facts of filings parsed so far, kept alongside the filing index and saved with it;
+        pass to `financial_statement.parse` to record a filing, and screen with `FilingMetadataIndex.screen`
+        """
+        if self._metadata is None:
+            from cayce.filing_metadata import FilingMetadataIndex
+
+            with self._lock:
+                if self._metadata is None:
+                    self._metadata = FilingMetadataIndex(self._cache_dir)
+        return self._metadata
+
+    @property
+    def _index(self) -> pd.DataFrame:
+        """The whole index in compact form, as a single DataFrame"""
+        snapshot = self._load_index()
+        if len(snapshot.chunks) == 0:
+            return _compact_index(pd.DataFrame([], columns=_INDEX_COLUMNS))
+        if len(snapshot.chunks) == 1:
+            return snapshot.chunks[0]
+
+        # consolidate completed quarters, so repeated full scans don't keep paying for
+        # the concat; the open quarter stays in a chunk of its own, to be swapped out
+        # by `_refresh_index` without copying the rest
+        open_quarter_start = _open_quarter_start(snapshot)
+        closed_chunks, open_chunks = [], []
+        for chunk in snapshot.chunks:
+            if _reaches(chunk, open_quarter_start):
+                open_chunks.append(chunk)
+            else:
+                closed_chunks.append(chunk)
+        if len(closed_chunks) > 1:
+            closed_chunks = [_concat_index(closed_chunks)]
+            with self._lock:
+                if self._snapshot is snapshot:
+                    self._snapshot = snapshot._replace(
+                        chunks=tuple(closed_chunks + open_chunks)
+                    )
+
+        chunks = closed_chunks + open_chunks
+        return chunks[0] if len(chunks) == 1 else _concat_index(chunks)
+
+    def flush(self):
+        """
+        Save the index to the cache directory, so the next EdgarIndex doesn't need to download it again.
 
-    def __del__(self):
+        The current quarter is left out, since EDGAR regenerates its index every day.
+        The cache file is replaced atomically (see `atomic_write`).
+        """
+        if self._metadata is not None:
+            self._metadata.flush()
+        if self._use_temp or self._snapshot is None:
+            # an index that was never loaded has nothing to add to what's already on disk
+            return
+
+        with self._lock:
+            snapshot = self._snapshot
+            open_quarter_start = _open_quarter_start(snapshot)
+
+            saved = 0
+            with atomic_write(self._index_cache_file, newline="") as f:
+                f.write(",".join(_INDEX_COLUMNS) + "\n")
+                # only a batch of rows is ever expanded back into strings at once
+                for chunk in snapshot.chunks:
+                    if _reaches(chunk, open_quarter_start):
+                        chunk = chunk[
+                            chunk["date_filed"] < pd.to_datetime(open_quarter_start)
+                        ]
+                    for start in range(0, len(chunk), _FLUSH_BATCH_ROWS):
+                        _expand_index(
+                            chunk.iloc[start : start + _FLUSH_BATCH_ROWS]
+                        ).to_csv(f, index=False, header=False)
+                    saved += len(chunk)
+            _LOG.info(f"Saved {saved} filings to {self._index_cache_file}")
+
+    def close(self):
+        """
+        Flush the index to disk and clean up the cache directory.
+        The index shouldn't be used afterwards.
+        """
         if self._use_temp:
+            shutil.rmtree(self._cache_dir, ignore_errors=True)
+            return
+
+        self.flush()
+        # the latest quarter will get regenerated by EDGAR every day,
+        # so delete the current quarter's cached file downloaded from EDGAR
+        current_date = dt.date.today()
+        current_quarter_file = path.join(
+            self._cache_dir,
+            f"{current_date.year}-{get_quarter(current_date)}-index.zip",
+        )
+        if path.exists(current_quarter_file):
+            remove(current_quarter_file)
+
+    def __enter__(self) -> "EdgarIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_use_temp", False):
             # Clean up temp directory, if used
             try:
                 shutil.rmtree(self._cache_dir)
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 _LOG.error(f"Failed to remove temp directory {self._cache_dir}", e)
-        else:
-            # the latest quarter will get regenerated by EDGAR every day
-            # so we should clear out data from the current quarter before saving
-            # and delete the current quarter's cached file downlaoded from EDGAR
-            current_date = dt.date.today()
-            current_quarter_file = path.join(
-                self._cache_dir,
-                f"{current_date.year}-{get_quarter(current_date)}-index.zip",
-            )
-            if path.exists(current_quarter_file):
-                remove(current_quarter_file)
-
-            current_quarter_start = pd.to_datetime(
-                get_start_of_quarter(dt.date.today())
-            )
-            date_mask = self._index["date_filed"] < current_quarter_start
-            self._index[date_mask].to_csv(self._index_cache_file, index=False)
 
     def _download_index(self, reference_date: dt.date) -> str:
         """
@@ -98,19 +444,20 @@ class EdgarIndex:
         """
         year = str(reference_date.year)
         quarter = get_quarter(reference_date)
-        url = (
-            f"http://sec.gov/Archives/edgar/full-index/{year}/QTR{quarter}/company.zip"
-        )
+        url = web.url(f"Archives/edgar/full-index/{year}/QTR{quarter}/company.zip")
         local_file_path = path.join(self._cache_dir, f"{year}-{quarter}-index.zip")
 
-        if path.exists(local_file_path):
+        # EDGAR regenerates a quarter's index every day until the quarter ends, so a file
+        # written before then (including by a process that never got to clean up) is incomplete
+        if path.exists(local_file_path) and dt.date.fromtimestamp(
+            path.getmtime(local_file_path)
+        ) > get_end_of_quarter(reference_date):
             _LOG.info(f"Using cached file {local_file_path}")
         else:
             _LOG.info(f"Downloading file {url}")
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0"
-            }
-            with requests.get(url, stream=True, headers=headers) as r:
+            with web.get(url, stream=True) as r:
+                # don't cache an error page in place of the index
+                r.raise_for_status()
                 with open(local_file_path, "wb") as f:
                     shutil.copyfileobj(r.raw, f)
 
@@ -132,7 +479,7 @@ class EdgarIndex:
 
         data = []
 
-        with ZipFile(file_name) as zipped:
+        with zipfile.ZipFile(file_name) as zipped:
             assert len(zipped.namelist()) == 1, "Only expecting archive to have 1 file"
 
             archived_file = zipped.namelist()[0]
@@ -147,52 +494,91 @@ class EdgarIndex:
                     line = line_bytes.decode("latin-1")
                     data.append(split_fixed_length(line, [62, 12, 12, 12]))
 
-        return pd.DataFrame(
-            data, columns=["company", "form_type", "cik", "date_filed", "file_name"]
-        )
+        return pd.DataFrame(data, columns=_INDEX_COLUMNS)
 
     def _refresh_index(
         self,
         start_date: dt.date = dt.date(1993, 1, 1),
         end_date: dt.date = dt.date.today(),
-    ):
+    ) -> _Snapshot:
+        """
+        Make sure the index covers `start_date` to `end_date`, downloading any quarters it's missing
+
+        Returns:
+            _Snapshot: A state of the index that covers the dates
+        """
         # fmt: off
         assert start_date >= dt.date(1993, 1, 1), "Sadly, EDGAR's memory only stretches back to Q1 1993"
         assert end_date <= dt.date.today(), "Unfortunately, EDGAR can't see into the future"
         # fmt: on
 
-        # if null, make these values such that we'll never see a sample date fall within the window
-        date = start_date
-        processed_files = []
-        subindex_dfs = []
-        while True:
-            if date < self._min_date or date > self._max_date:
-                file_name = self._download_index(date)
-
-                # since we don't control if the end_date is the first day of a new quarter and the
-                # length of the window we search, ensure we don't process the same index twice...
-                if file_name not in processed_files:
-                    subindex_dfs.append(self._process_company_idx(file_name))
-                    processed_files.append(file_name)
-            if date == end_date:
-                break
+        snapshot = self._load_index()
+        if snapshot.min_date <= start_date and end_date <= snapshot.max_date:
+            return snapshot
+
+        with self._lock:
+            # someone else may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+
+            # the index is loaded a whole quarter at a time, and always covers one unbroken
+            # run of quarters, so fill any gap between what's loaded and what's asked for
+            min_date = min(get_start_of_quarter(start_date), snapshot.min_date)
+            max_date = max(
+                min(get_end_of_quarter(end_date), dt.date.today()), snapshot.max_date
+            )
+            current_quarter_start = get_start_of_quarter(dt.date.today())
+            chunks = snapshot.chunks
+            # the latest quarter loaded may only have been listed up to the day it was loaded;
+            # if that's no longer far enough, swap it for a fresh copy
+            stale_quarter_start = None
+            if chunks and end_date > snapshot.max_date:
+                stale_quarter_start = _open_quarter_start(snapshot)
+                if stale_quarter_start <= snapshot.max_date:
+                    # only the chunks reaching into that quarter need to be filtered,
+                    # usually just the one it was downloaded into
+                    chunks = tuple(
+                        (
+                            chunk[
+                                chunk["date_filed"]
+                                < pd.to_datetime(stale_quarter_start)
+                            ]
+                            if _reaches(chunk, stale_quarter_start)
+                            else chunk
+                        )
+                        for chunk in chunks
+                    )
+                    chunks = tuple(chunk for chunk in chunks if len(chunk) > 0)
+
+            subindex_dfs = []
+            completed_quarter = False
+            for quarter_start in get_quarters(min_date, max_date):
+                if (
+                    snapshot.min_date <= quarter_start <= snapshot.max_date
+                    and quarter_start != stale_quarter_start
+                ):
+                    continue
+                file_name = self._download_index(quarter_start)
+                subindex_dfs.append(self._process_company_idx(file_name))
+                completed_quarter |= quarter_start < current_quarter_start
+
+            # append all new index files to the master index
+            snapshot = _Snapshot(
+                chunks
+                + tuple(_compact_index(subindex_df) for subindex_df in subindex_dfs),
+                min_date,
+                max_date,
+            )
+            self._snapshot = snapshot
 
-            # 3m forward should be in the next quarter
-            date = add_months(date, 3)
-            if date > end_date:
-                # ensure we always query the end date specifically
-                date = end_date
+            if completed_quarter and self._auto_flush:
+                self.flush()
 
-        if start_date < self._min_date:
-            self._min_date = start_date
-        if end_date > self._max_date:
-            self._max_date = end_date
+        with self._name_lock:
+            if self._name_index is not None:
+                for subindex_df in subindex_dfs:
+                    self._name_index.add(subindex_df["company"], subindex_df["cik"])
 
-        # append all new index files to the master index
-        if len(subindex_dfs) > 0:
-            subindex_df = pd.concat(subindex_dfs)
-            self._index = self._index.append(subindex_df, ignore_index=True)
-            self._index["date_filed"] = pd.to_datetime(self._index["date_filed"])
+        return snapshot
 
     def search(
         self,
@@ -208,40 +594,73 @@ class EdgarIndex:
             start_date (dt.date, optional): Earliest date to accept. Defaults to 1993-01-01 (the earliest date on EDGAR).
             end_date (dt.date, optional): Latest date to accept. Defaults to today() (implicitly the latest possible date).
             ciks (Union[str, List[str]], optional):
-                Provide one or more CIK values to filter on. Single value can be passed a string, multiple as a list.  
+                Provide one or more CIK values to filter on. Single value can be passed a string, multiple as a list.
                 Defaults to None, which doesn't filter on this column.
             form_types (Union[str, List[str]], optional):
-                Provide one or more form types to filter on. Single value can be passed a string, multiple as a list.  
+                Provide one or more form types to filter on. Single value can be passed a string, multiple as a list.
                 Defaults to None, which doesn't filter on this column.
         """
-        self._refresh_index(start_date, end_date)
-
-        if ciks:
-            if isinstance(ciks, str):
-                ciks = [ciks]
-            result_df = self._index[self._index["cik"].isin(ciks)]
-        else:
-            result_df = self._index
-
-        result_df = result_df[
-            (result_df["date_filed"] >= pd.to_datetime(start_date))
-            & (result_df["date_filed"] <= pd.to_datetime(end_date))
-        ]
-
-        if form_types:
-            if isinstance(form_types, str):
-                form_types = [form_types]
-            result_df = result_df[result_df["form_type"].isin(form_types)]
+        snapshot = self._refresh_index(start_date, end_date)
+
+        if isinstance(ciks, str):
+            ciks = [ciks]
+        if isinstance(form_types, str):
+            form_types = [form_types]
+        cik_values = _parse_ciks(ciks) if ciks else None
+
+        result_dfs = []
+        for chunk in snapshot.chunks:
+            mask = (chunk["date_filed"] >= pd.to_datetime(start_date)) & (
+                chunk["date_filed"] <= pd.to_datetime(end_date)
+            )
+            if cik_values is not None:
+                mask &= chunk["cik"].isin(cik_values)
+            if form_types:
+                mask &= chunk["form_type"].isin(form_types)
+            result_dfs.append(chunk[mask])
+
+        if len(result_dfs) == 0:
+            return pd.DataFrame([], columns=_INDEX_COLUMNS)
+        return _expand_index(_concat_index(result_dfs))
+
+    def search_companies(
+        self, name: str, limit: int = 10, min_score: float = 0.3
+    ) -> pd.DataFrame:
+        """
+        Find CIK codes for companies whose name resembles `name`.
+        Only quarters already loaded by `search` (or held in the cache) are considered.
 
-        return result_df
+        Args:
+            name (str): (Partial) company name, eg "apple inc."
+            limit (int, optional): Maximum number of matches to return. Defaults to 10.
+            min_score (float, optional):
+                Minimum similarity score (0-1) to accept. Defaults to 0.3.
 
-    def download_xbrl(self, search_record: List[Any], save_raw: bool = False) -> str:
+        Returns:
+            pd.DataFrame: cik, company and score for each match, best match first
         """
-        Pull a full filing from the SEC website and strip out everything
+        with self._name_lock:
+            if self._name_index is None:
+                self._name_index = CompanyNameIndex()
+                for chunk in self._load_index().chunks:
+                    companies_df = chunk[["company", "cik"]].drop_duplicates()
+                    self._name_index.add(
+                        companies_df["company"].astype(str),
+                        companies_df["cik"].astype(str),
+                    )
+            matches = self._name_index.search(name, limit, min_score)
+
+        return pd.DataFrame(matches, columns=["cik", "company", "score"])
+
+    def download_xbrl(
+        self, search_record: List[Any], save_raw: bool = False, selective: bool = True
+    ) -> str:
+        """
+        Pull a filing from the SEC website and strip out everything
         outside of the XBRL content for this specific form
 
         Args:
-            search_record: 
+            search_record:
                 The value array of a row taken from the `search` method
                 Expected to be the following elements, in order:
                     Company Name
@@ -250,86 +669,191 @@ class EdgarIndex:
                     Filing Date
                     File Name (partial URL from edgar)
             save_raw: Do we save the full archive file from EDGAR?
-        
+            selective:
+                Download only the documents we need, as listed on the filing's index page,
+                rather than the full submission with every exhibit, image and PDF?
+                Falls back to the full submission if the index page doesn't list them.
+                Ignored when saving the raw file. Defaults to True.
+
         Returns:
             (str) Full path to the local file
         """
         company, form_type, _, date_filed, file_name = search_record
+        if form_type not in ["10-K", "10-Q", "4"]:
+            raise ValueError(f"Content parser not available for {form_type}")
         _LOG.info(
             f"Begin downloading {company} form {form_type} for {date_filed:%Y-%m-%d}"
         )
-        url = f"https://www.sec.gov/Archives/{file_name}"
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0"
-        }
-        response = requests.get(url, headers=headers)
-        file_content = response.content.decode("utf-8").split("\n")
 
         cleaned_company_name = re.sub("\W+", "_", company)
-        file_suffix = file_name.split("/")[-1].split(".")[0].split("-")[-1]
-
-        if save_raw:
-            with open(
-                path.join(
-                    self._cache_dir,
-                    "raw",
-                    f"{cleaned_company_name}_{form_type}_{date_filed:%Y%m%d}_{file_suffix}.txt",
-                ),
-                mode="w",
-            ) as raw_file:
-                raw_file.write("\n".join(file_content))
-
-        if form_type == "10-K" or form_type == "10-Q":
-            document_payload = self._get_financial_statement_payload(file_content)
-        elif form_type == "4":
-            document_payload = self._get_beneficial_ownership_payload(file_content)
-        else:
-            raise ValueError(f"Content parser not available for {form_type}")
+        # the accession number, so the file can be traced back to its filing
+        file_suffix = file_name.split("/")[-1].split(".")[0]
+
+        payloads = None
+        if selective and not save_raw:
+            payloads = self._get_selected_payloads(form_type, file_name)
+
+        if payloads is None:
+            url = web.url(f"Archives/{file_name}")
+
+            response = web.get(url)
+            response.raise_for_status()
+            file_content = response.content.decode("utf-8").split("\n")
+
+            if save_raw:
+                makedirs(path.join(self._cache_dir, "raw"), exist_ok=True)
+                with open(
+                    path.join(
+                        self._cache_dir,
+                        "raw",
+                        f"{cleaned_company_name}_{form_type}_{date_filed:%Y%m%d}_{file_suffix}.txt",
+                    ),
+                    mode="w",
+                ) as raw_file:
+                    raw_file.write("\n".join(file_content))
+
+            if form_type == "4":
+                payloads = {
+                    "PRIMARY": self._get_beneficial_ownership_payload(file_content)
+                }
+            else:
+                payloads = self._get_financial_statement_payloads(file_content)
 
+        extension = "xml"
+        if form_type == "4":
+            document_payload = payloads.pop("PRIMARY", [])
+        else:
+            document_payload = payloads.pop("INS", [])
+            inline_payload = payloads.pop("IXBRL", [])
+            # inline XBRL filings don't always come with a separate instance document;
+            # keep the primary document instead, for `inline_xbrl` to parse
+            if not document_payload and inline_payload:
+                document_payload = inline_payload
+                extension = "htm"
+        # whatever is left are linkbases
+        linkbase_payloads = payloads
+
+        makedirs(path.join(self._cache_dir, "xbrl"), exist_ok=True)
         local_xbrl_file_path = path.join(
             self._cache_dir,
             "xbrl",
-            f"{cleaned_company_name}_{form_type}_{date_filed:%Y%m%d}_{file_suffix}.xml",
+            f"{cleaned_company_name}_{form_type}_{date_filed:%Y%m%d}_{file_suffix}.{extension}",
         )
         _LOG.info(f"Writing local cache file {local_xbrl_file_path}")
         with open(local_xbrl_file_path, mode="w") as xbrl_writer:
-            xbrl_writer.writelines(document_payload)
+            xbrl_writer.write("\n".join(document_payload))
+
+        # linkbases sit next to the instance document, where `financial_statement` looks for them
+        for kind, linkbase_payload in linkbase_payloads.items():
+            linkbase_file_path = (
+                f"{path.splitext(local_xbrl_file_path)[0]}.{kind.lower()}.xml"
+            )
+            with open(linkbase_file_path, mode="w") as linkbase_writer:
+                linkbase_writer.write("\n".join(linkbase_payload))
 
         return local_xbrl_file_path
 
+    def _get_selected_payloads(
+        self, form_type: str, file_name: str
+    ) -> Optional[Dict[str, List[str]]]:
+        """
+        Download just the documents we need from a filing, as listed on its index page
+
+        Returns:
+            Optional[Dict[str, List[str]]]:
+                Payload lines keyed by document kind, as for `_get_financial_statement_payloads`
+                (or PRIMARY for a Form 4), or None if the index page doesn't list what we need
+        """
+        file_name_match = re.match(_SUBMISSION_RE, file_name)
+        if file_name_match is None:
+            return None
+        cik, accession = file_name_match.groups()
+        folder = f"Archives/edgar/data/{cik}/{accession.replace('-', '')}"
+
+        response = web.get(web.url(f"{folder}/{accession}-index.htm"))
+        if response.status_code != 200:
+            _LOG.info(f"No filing index for {file_name} ({response.status_code})")
+            return None
+
+        documents = {}
+        for description, document, href, document_type in _parse_filing_index(
+            response.content
+        ):
+            kind = _classify_document(
+                form_type, description, document, href, document_type
+            )
+            if kind is not None:
+                documents.setdefault(kind, href)
+
+        if "INS" in documents:
+            documents.pop("IXBRL", None)
+        if not ({"INS", "IXBRL", "PRIMARY"} & documents.keys()):
+            _LOG.info(f"Filing index for {file_name} doesn't list a document to parse")
+            return None
+
+        payloads = {}
+        for kind, href in documents.items():
+            document_response = web.get(web.url(href))
+            if document_response.status_code != 200:
+                _LOG.warning(
+                    f"Failed to download {href} ({document_response.status_code})"
+                )
+                return None
+            payloads[kind] = document_response.content.decode("utf-8").split("\n")
+        return payloads
+
     def _get_financial_statement_payload(self, file_content: List[str]):
         """
         Extract filing payload for 10-Q and 10-K filings
         """
-        found_document = False
-        found_xbrl_payload = False
-        xbrl_payload = []
-        found_document_re = re.compile(
-            "^(<DESCRIPTION>(XBRL INSTANCE (DOCUMENT|FILE)|EX-101.INS)|<TYPE>EX-101.INS|<FILENAME>.+_htm\.xml)$",
+        return self._get_financial_statement_payloads(file_content).get("INS", [])
+
+    def _get_financial_statement_payloads(
+        self, file_content: List[str]
+    ) -> Dict[str, List[str]]:
+        """
+        Extract the XBRL instance and its calculation, presentation and label linkbases
+        from a 10-Q or 10-K filing, in a single pass over the submission.
+        Inline XBRL primary documents (the 10-K or 10-Q itself, wrapped in <XBRL>) are kept too.
+
+        Returns:
+            Dict[str, List[str]]:
+                Payload lines keyed by document kind (INS, CAL, PRE, LAB, IXBRL)
+        """
+        found_instance_re = re.compile(
+            r"^(<DESCRIPTION>(XBRL INSTANCE (DOCUMENT|FILE)|EX-101.INS)|<TYPE>EX-101.INS|<FILENAME>.+_htm\.xml)$",
             re.IGNORECASE,
         )
-        end_payload_tag = (
-            "<>/\[]/\<>"  # nonsense line, just a placeholder, should never be found
-        )
+        found_linkbase_re = re.compile(r"^<TYPE>EX-101\.(CAL|PRE|LAB)$", re.IGNORECASE)
+        found_primary_re = re.compile(r"^<TYPE>10-[KQ](/A)?$", re.IGNORECASE)
+
+        payloads = {}
+        document_kind = None
+        payload = None
+        end_payload_tag = None
         for line in file_content:
-            if not found_document:
-                if re.match(found_document_re, line):
-                    found_document = True
-                continue
-            elif not found_xbrl_payload:
-                if line.lower().strip() == "<xml>":
-                    found_xbrl_payload = True
-                    end_payload_tag = "</xml>"
-                elif line.lower().strip() == "<xbrl>":
-                    found_xbrl_payload = True
-                    end_payload_tag = "</xbrl>"
-                continue
-            elif line.lower().strip() == end_payload_tag:
-                break
-            else:
-                xbrl_payload.append(line)
-        return xbrl_payload
+            if payload is not None:
+                if line.lower().strip() == end_payload_tag:
+                    payload = None
+                    document_kind = None
+                else:
+                    payload.append(line)
+            elif line.startswith("<DOCUMENT>"):
+                document_kind = None
+            elif document_kind is None:
+                linkbase_match = re.match(found_linkbase_re, line)
+                if linkbase_match:
+                    document_kind = linkbase_match.group(1).upper()
+                elif re.match(found_instance_re, line):
+                    document_kind = "INS"
+                elif re.match(found_primary_re, line):
+                    document_kind = "IXBRL"
+            elif document_kind not in payloads:
+                tag = line.lower().strip()
+                if tag == "<xml>" or tag == "<xbrl>":
+                    payload = payloads[document_kind] = []
+                    end_payload_tag = f"</{tag[1:]}"
+        return payloads
 
     def _get_beneficial_ownership_payload(self, file_content: List[str]):
         """
@@ -0,0 +1,295 @@
+"""
+Share one filing index between many processes
+
+One process exports an `EdgarIndex` as a directory of memory mapped column files
+(plain .npy arrays, sorted by date filed); any number of worker processes then attach
+to it read-only with `SharedEdgarIndex` and search it. The operating system shares the
+mapped pages between every process, so memory use doesn't grow with the number of workers,
+and nothing is copied or parsed on attach.
+
+Each export writes a new generation of column files and then atomically replaces
+index.json, which names the current generation. Attached processes keep reading
+the generation they have mapped until they call `SharedEdgarIndex.reload`.
+The files of the previous generation are kept until the export after, so a process
+that has just read index.json can still map the generation it names.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import glob
+import json
+from os import makedirs, path, remove
+import threading
+import time
+from typing import Dict, List, NamedTuple, Union
+
+from cayce.utils import atomic_write, lazy_import
+from cayce.log import get_logger
+from cayce.query import EdgarIndex, _expand_index, _parse_ciks
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+_LOG = get_logger(__name__)
+
+_META_FILE = "index.json"
+_COLUMNS = [
+    "date_filed",
+    "cik",
+    "accession",
+    "company_codes",
+    "form_type_codes",
+    # -1 except for the few file names that couldn't be reduced to an accession number
+    "file_name_codes",
+    # distinct values of the dictionary encoded columns, as utf-8 bytes
+    "companies",
+    "form_types",
+    "file_names",
+]
+
+
+def _column_file(directory: str, name: str, generation: str) -> str:
+    return path.join(directory, f"{name}.{generation}.npy")
+
+
+def _encode_strings(values) -> np.ndarray:
+    """Fixed width bytes, which (unlike Python strings) can be memory mapped"""
+    return np.array([value.encode("utf-8") for value in values], dtype=bytes)
+
+
+def _dictionary_encode(values: pd.Series):
+    """Codes and distinct values of a column, whether or not it is already categorical"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    return values.cat.codes.values, values.cat.categories
+
+
+def _read_meta(directory: str) -> dict:
+    with open(path.join(directory, _META_FILE)) as f:
+        return json.load(f)
+
+
+def export_index(index: EdgarIndex, directory: str) -> str:
+    """
+    Write the filing index out as memory mappable column files, for `SharedEdgarIndex` to attach to.
+    An empty index (eg one that was never refreshed) is refused with a ValueError, since it
+    doesn't cover any dates.
+
+    Args:
+        index (EdgarIndex): The index to export, as loaded and refreshed so far
+        directory (str): Where to write the column files
+
+    Returns:
+        str: The generation written
+    """
+    snapshot = index._load_index()
+    index_df = index._index
+    if len(index_df) == 0:
+        raise ValueError(
+            "Nothing to export; refresh the index over the dates needed first"
+        )
+    makedirs(directory, exist_ok=True)
+
+    # sorted by date, so searches only touch the slice of each column they need
+    order = np.argsort(index_df["date_filed"].values, kind="stable")
+    company_codes, companies = _dictionary_encode(index_df["company"])
+    form_type_codes, form_types = _dictionary_encode(index_df["form_type"])
+    file_name_codes, file_names = _dictionary_encode(index_df["file_name"])
+    columns = {
+        "date_filed": index_df["date_filed"].values[order],
+        "cik": index_df["cik"].values[order],
+        "accession": index_df["accession"].values[order],
+        "company_codes": company_codes[order],
+        "form_type_codes": form_type_codes[order],
+        "file_name_codes": file_name_codes[order],
+        "companies": _encode_strings(companies),
+        "form_types": _encode_strings(form_types),
+        "file_names": _encode_strings(file_names),
+    }
+
+    previous_generation = None
+    if path.exists(path.join(directory, _META_FILE)):
+        previous_generation = _read_meta(directory)["generation"]
+
+    generation = f"{time.time_ns():x}"
+    for name, values in columns.items():
+        np.save(_column_file(directory, name, generation), values)
+
+    with atomic_write(path.join(directory, _META_FILE)) as f:
+        json.dump(
+            {
+                "generation": generation,
+                "rows": len(index_df),
+                "min_date": snapshot.min_date.isoformat(),
+                "max_date": snapshot.max_date.isoformat(),
+            },
+            f,
+        )
+    _LOG.info(f"Exported {len(index_df)} filings to {directory} ({generation})")
+
+    # processes still attached to older generations keep their mappings after the files are unlinked
+    keep = {generation, previous_generation}
+    for file_name in glob.glob(path.join(directory, "*.npy")):
+        if file_name.rsplit(".", 2)[-2] not in keep:
+            try:
+                remove(file_name)
+            except OSError as e:
+                _LOG.warning(f"Couldn't remove old index file {file_name}: {e}")
+
+    return generation
+
+
+class _Attached(NamedTuple):
+    """One generation of the shared index, as mapped into this process"""
+
+    generation: str
+    columns: Dict[str, np.ndarray]
+    form_type_codes: Dict[str, int]
+    min_date: dt.date
+    max_date: dt.date
+
+
+class SharedEdgarIndex:
+    def __init__(self, directory: str):
+        """
+        Attach (read-only) to a filing index exported by `export_index`
+
+        Args:
+            directory (str): Directory the index was exported to
+        """
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._attached: _Attached = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Attach to the latest export, if there has been one since this index was attached
+
+        Returns:
+            bool: Whether a newer export was attached
+        """
+        meta = _read_meta(self._directory)
+
+        with self._lock:
+            while True:
+                if (
+                    self._attached is not None
+                    and self._attached.generation == meta["generation"]
+                ):
+                    return False
+
+                try:
+                    columns = {
+                        name: np.load(
+                            _column_file(self._directory, name, meta["generation"]),
+                            mmap_mode="r",
+                        )
+                        for name in _COLUMNS
+                    }
+                    break
+                except FileNotFoundError:
+                    # superseded (and removed) by more than one export since index.json was read
+                    latest_meta = _read_meta(self._directory)
+                    if latest_meta["generation"] == meta["generation"]:
+                        raise
+                    meta = latest_meta
+
+            form_type_codes = {
+                form_type.decode("utf-8"): code
+                for code, form_type in enumerate(columns["form_types"])
+            }
+            # searches use whichever generation they started with, so this swap is all they see
+            self._attached = _Attached(
+                meta["generation"],
+                columns,
+                form_type_codes,
+                dt.date.fromisoformat(meta["min_date"]),
+                dt.date.fromisoformat(meta["max_date"]),
+            )
+        _LOG.info(f"Attached to {self._directory} ({meta['generation']})")
+        return True
+
+    def __len__(self) -> int:
+        return len(self._attached.columns["cik"])
+
+    def search(
+        self,
+        start_date: dt.date = dt.date(1993, 1, 1),
+        end_date: dt.date = dt.date.today(),
+        ciks: Union[str, List[str]] = None,
+        form_types: Union[str, List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Search the shared index for filings matching a provided criteria,
+        in the same way (and with the same output) as `EdgarIndex.search`,
+        except that results are sorted by date filed.
+
+        The shared index is read-only: dates it doesn't cover are not downloaded,
+        so export an index that has been refreshed over every date the workers need.
+
+        Args:
+            start_date (dt.date, optional): Earliest date to accept. Defaults to 1993-01-01.
+            end_date (dt.date, optional): Latest date to accept. Defaults to today().
+            ciks (Union[str, List[str]], optional):
+                Provide one or more CIK values to filter on. Defaults to None, which doesn't filter on this column.
+            form_types (Union[str, List[str]], optional):
+                Provide one or more form types to filter on. Defaults to None, which doesn't filter on this column.
+        """
+        attached = self._attached
+        if attached.min_date > attached.max_date:
+            # only ever written by exports that didn't refuse an empty index
+            _LOG.warning(f"Shared index {self._directory} is empty")
+        elif start_date < attached.min_date or end_date > attached.max_date:
+            _LOG.warning(
+                f"Shared index only covers {attached.min_date} to {attached.max_date}"
+            )
+
+        if isinstance(ciks, str):
+            ciks = [ciks]
+        if isinstance(form_types, str):
+            form_types = [form_types]
+
+        columns = attached.columns
+        start = np.searchsorted(
+            columns["date_filed"], np.datetime64(start_date, "ns"), side="left"
+        )
+        end = np.searchsorted(
+            columns["date_filed"], np.datetime64(end_date, "ns"), side="right"
+        )
+
+        mask = np.ones(max(end - start, 0), dtype=bool)
+        if ciks:
+            mask &= np.isin(columns["cik"][start:end], _parse_ciks(ciks))
+        if form_types:
+            mask &= np.isin(
+                columns["form_type_codes"][start:end],
+                [
+                    attached.form_type_codes[form_type]
+                    for form_type in form_types
+                    if form_type in attached.form_type_codes
+                ],
+            )
+        rows = np.flatnonzero(mask) + start
+
+        companies = columns["companies"][columns["company_codes"][rows]]
+        form_types = columns["form_types"][columns["form_type_codes"][rows]]
+        file_name_codes = columns["file_name_codes"][rows]
+        file_names = np.full(len(rows), None, dtype=object)
+        file_names[file_name_codes >= 0] = np.char.decode(
+            columns["file_names"][file_name_codes[file_name_codes >= 0]], "utf-8"
+        )
+        return _expand_index(
+            pd.DataFrame(
+                {
+                    "company": np.char.decode(companies, "utf-8"),
+                    "form_type": np.char.decode(form_types, "utf-8"),
+                    "cik": columns["cik"][rows],
+                    "date_filed": columns["date_filed"][rows],
+                    "accession": columns["accession"][rows],
+                    "file_name": file_names,
+                }
+            )
+        )
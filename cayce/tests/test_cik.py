@@ -1,8 +1,21 @@
+import os
 import unittest as ut
 import cayce.cik as cik
+from cayce.mock_edgar import MockEdgarServer
+from cayce import web
 
 
 class TestCik(ut.TestCase):
+    def setUp(self):
+        self.base_url = web._base_url
+
+    def tearDown(self):
+        web.set_base_url(self.base_url)
+
+    @ut.skipUnless(
+        os.environ.get("CAYCE_ONLINE_TESTS"),
+        "talks to www.sec.gov; set CAYCE_ONLINE_TESTS=1 to run",
+    )
     def test_get_ticker_to_cik_map(self):
         mappings = cik.get_ticker_to_cik_map()
         assert isinstance(mappings, dict)
@@ -10,7 +23,14 @@ class TestCik(ut.TestCase):
         assert "AAPL" in mappings
         # assumption: CIK codes will always be numeric
         assert mappings["AAPL"].isdigit()
-        print(mappings["AAPL"])
+
+    def test_get_ticker_to_cik_map_offline(self):
+        with MockEdgarServer() as server:
+            web.set_base_url(server.url)
+            mappings = cik.get_ticker_to_cik_map()
+        self.assertEqual(
+            {"AAPL": "320193", "MSFT": "789019", "PLE": "1418121"}, mappings
+        )
 
 
 if __name__ == "__main__":
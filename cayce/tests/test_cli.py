@@ -0,0 +1,120 @@
+import os
+from os import path
+import shutil
+import tempfile
+import unittest as ut
+
+import pandas as pd
+
+import cayce.cli as cli
+from cayce.filing_metadata import FilingMetadataIndex
+
+_FIXTURE_DIR = path.join(path.dirname(__file__), "fixtures")
+
+
+class TestCli(ut.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test__get_form_type(self):
+        self.assertEqual(
+            "10-K",
+            cli._get_form_type("/x/APPLE_INC_10-K_20201030_0000320193-20-000096.xml"),
+        )
+        self.assertEqual(
+            "4", cli._get_form_type("Levinson_Arthur_D_4_20201104_000012.xml")
+        )
+
+    def test_parse(self):
+        input_dir = path.join(self.work_dir, "xbrl")
+        os.mkdir(input_dir)
+        shutil.copy(
+            path.join(_FIXTURE_DIR, "form4.xml"),
+            path.join(input_dir, "Apple_Inc_4_20201104_000012.xml"),
+        )
+        output_file = path.join(self.work_dir, "facts.csv")
+
+        cli.main(
+            [
+                "parse",
+                input_dir,
+                "--output",
+                output_file,
+                "--workers",
+                "1",
+                "--cache-dir",
+                path.join(self.work_dir, "cache"),
+            ]
+        )
+
+        facts_df = pd.read_csv(output_file)
+        self.assertEqual(2, len(facts_df))
+        self.assertEqual(
+            {"Apple_Inc_4_20201104_000012.xml"}, set(facts_df["file_name"])
+        )
+        self.assertEqual([-50000.0, 1000.0], facts_df["shares"].tolist())
+
+    def test_parse_records_cover_pages(self):
+        input_dir = path.join(self.work_dir, "xbrl")
+        os.mkdir(input_dir)
+        shutil.copy(
+            path.join(
+                _FIXTURE_DIR,
+                "edgar/Archives/edgar/data/320193/000032019320000096/aapl-20200926.xml",
+            ),
+            path.join(input_dir, "APPLE_INC_10-K_20201030_0000320193-20-000096.xml"),
+        )
+        shutil.copy(
+            path.join(_FIXTURE_DIR, "form4.xml"),
+            path.join(input_dir, "Apple_Inc_4_20201104_0001209191-20-055218.xml"),
+        )
+        cache_dir = path.join(self.work_dir, "cache")
+
+        cli.main(
+            [
+                "parse",
+                input_dir,
+                "--output",
+                path.join(self.work_dir, "facts.csv"),
+                "--workers",
+                "1",
+                "--cache-dir",
+                cache_dir,
+            ]
+        )
+
+        # only financial statements have a cover page
+        metadata_df = FilingMetadataIndex(cache_dir).screen()
+        self.assertEqual(["0000320193-20-000096"], metadata_df["accession"].tolist())
+        self.assertEqual("FY", metadata_df["fiscal_period"].iloc[0])
+        self.assertEqual(pd.Timestamp(2020, 10, 30), metadata_df["date_filed"].iloc[0])
+
+    def test_search_arguments(self):
+        args = cli._build_parser().parse_args(
+            [
+                "search",
+                "--cik",
+                "320193",
+                "--cik",
+                "789019",
+                "--form-type",
+                "10-K",
+                "--output",
+                "x.csv",
+            ]
+        )
+        self.assertEqual(["320193", "789019"], args.ciks)
+        self.assertEqual(["10-K"], args.form_types)
+        self.assertEqual(10.0, args.rate_limit)
+
+        # only the steps that fan out over filings take a number of workers
+        self.assertFalse(hasattr(args, "workers"))
+        args = cli._build_parser().parse_args(["download", "x.csv"])
+        self.assertEqual(4, args.workers)
+
+
+if __name__ == "__main__":
+    ut.main()
@@ -0,0 +1,109 @@
+import datetime as dt
+from os import path
+import re
+import shutil
+import tempfile
+import unittest as ut
+
+from cayce.filing_metadata import FilingMetadataIndex
+from cayce.parsers import financial_statement, inline_xbrl
+from cayce.query import EdgarIndex
+
+_FIXTURE_DIR = path.join(path.dirname(__file__), "fixtures", "edgar", "Archives")
+_INSTANCE_FILE = path.join(
+    _FIXTURE_DIR, "edgar/data/320193/000032019320000096/aapl-20200926.xml"
+)
+_INLINE_SUBMISSION_FILE = path.join(
+    _FIXTURE_DIR, "edgar/data/789019/0001564590-20-047996.txt"
+)
+
+
+class TestFilingMetadata(ut.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.instance_file = path.join(
+            self.cache_dir, "APPLE_INC_10-K_20201030_0000320193-20-000096.xml"
+        )
+        shutil.copy(_INSTANCE_FILE, self.instance_file)
+
+        self.inline_file = path.join(
+            self.cache_dir, "MICROSOFT_CORP_10-Q_20201027_047996.htm"
+        )
+        with open(_INLINE_SUBMISSION_FILE) as f:
+            inline_document = re.search(r"<XBRL>\s*(.*?)</XBRL>", f.read(), re.S)
+        with open(self.inline_file, "w") as f:
+            f.write(inline_document.group(1))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cover_page(self):
+        cover_page = financial_statement.cover_page(
+            financial_statement.parse(self.instance_file)
+        )
+        self.assertEqual(
+            {
+                "cik": "320193",
+                "company": "Apple Inc.",
+                "form_type": "10-K",
+                # no DocumentPeriodEndDate, so taken from the context of DocumentType
+                "period_end": dt.date(2020, 9, 26),
+                "fiscal_year": 2020,
+                "fiscal_period": "FY",
+                "fiscal_year_end": "--09-26",
+                "shares_outstanding": 17001802000.0,
+            },
+            cover_page,
+        )
+
+    def test_screen(self):
+        with EdgarIndex(self.cache_dir) as index:
+            # the accession number is taken from the name the file was downloaded under
+            financial_statement.parse(self.instance_file, metadata_index=index.metadata)
+            inline_xbrl.parse(
+                self.inline_file,
+                metadata_index=index.metadata,
+                accession="0001564590-20-047996",
+            )
+            # unless it was downloaded before the name included all of it
+            self.assertRaises(
+                ValueError,
+                inline_xbrl.parse,
+                self.inline_file,
+                metadata_index=index.metadata,
+            )
+
+        # saved alongside the filing index, so no XBRL is needed to screen
+        metadata = FilingMetadataIndex(self.cache_dir)
+        self.assertEqual(2, len(metadata))
+
+        june_year_end_df = metadata.screen(
+            dt.date(2020, 10, 1), dt.date(2020, 10, 31), fiscal_year_end_months=6
+        )
+        self.assertEqual(
+            ["0001564590-20-047996"], june_year_end_df["accession"].tolist()
+        )
+        self.assertEqual("Q1", june_year_end_df["fiscal_period"].iloc[0])
+        self.assertEqual(2021, june_year_end_df["fiscal_year"].iloc[0])
+        self.assertEqual(
+            dt.date(2020, 10, 27), june_year_end_df["date_filed"].iloc[0].date()
+        )
+
+        self.assertEqual(
+            ["MICROSOFT CORPORATION", "Apple Inc."],
+            metadata.screen(min_shares_outstanding=1e9)["company"].tolist(),
+        )
+        self.assertEqual(
+            ["Apple Inc."],
+            metadata.screen(form_types="10-K", ciks="0000320193")["company"].tolist(),
+        )
+        self.assertEqual(0, len(metadata.screen(fiscal_periods="Q3")))
+        self.assertEqual(0, len(metadata.screen(ciks="not-a-cik")))
+
+        # parsing the same filing again replaces its row
+        financial_statement.parse(self.instance_file, metadata_index=metadata)
+        self.assertEqual(2, len(metadata))
+
+
+if __name__ == "__main__":
+    ut.main()
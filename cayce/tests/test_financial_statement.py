@@ -0,0 +1,141 @@
+import datetime as dt
+from os import path
+import shutil
+import tempfile
+import unittest as ut
+
+from cayce.parsers import financial_statement
+from cayce.query import EdgarIndex
+
+_SUBMISSION_FILE = path.join(
+    path.dirname(__file__),
+    "fixtures/edgar/Archives/edgar/data/320193/0000320193-20-000096.txt",
+)
+
+
+class TestFinancialStatement(ut.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.work_dir = tempfile.mkdtemp()
+        with open(_SUBMISSION_FILE) as f:
+            file_content = f.read().split("\n")
+        payloads = EdgarIndex(cls.work_dir)._get_financial_statement_payloads(
+            file_content
+        )
+
+        cls.instance_file = path.join(
+            cls.work_dir, "APPLE_INC_10-K_20201030_000096.xml"
+        )
+        for kind, payload in payloads.items():
+            file_name = (
+                cls.instance_file
+                if kind == "INS"
+                else financial_statement.linkbase_file_name(
+                    cls.instance_file, kind.lower()
+                )
+            )
+            with open(file_name, "w") as f:
+                f.write("\n".join(payload))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.work_dir)
+
+    def test_parse(self):
+        statement_df = financial_statement.parse(self.instance_file)
+        self.assertEqual(
+            ["period_start", "period_end", "attribute_name", "attribute_value", "unit"],
+            statement_df.columns.tolist(),
+        )
+        # the facts for the iPhone segment are dropped
+        revenue_df = statement_df[
+            statement_df["attribute_name"]
+            == "RevenueFromContractWithCustomerExcludingAssessedTax"
+        ]
+        self.assertEqual([274515000000.0], revenue_df["attribute_value"].tolist())
+        self.assertEqual(dt.date(2019, 9, 29), revenue_df["period_start"].iloc[0])
+
+        assets = statement_df.set_index("attribute_name").loc["Assets"]
+        self.assertIsNone(assets["period_start"])
+        self.assertEqual(dt.date(2020, 9, 26), assets["period_end"])
+        self.assertEqual("USD", assets["unit"])
+
+        eps = statement_df.set_index("attribute_name").loc["EarningsPerShareBasic"]
+        self.assertEqual("USD/SHARES", eps["unit"])
+
+    def test_parse_row_order(self):
+        instance_file = path.join(self.work_dir, "ORDER_10-K_20201030_000002.xml")
+        with open(instance_file, "w") as f:
+            f.write(
+                """<xbrl xmlns="http://www.xbrl.org/2003/instance">
+<context id="I"><entity><identifier>1</identifier></entity><period><instant>2020-09-26</instant></period></context>
+<context id="D"><entity><identifier>1</identifier></entity><period><startDate>2019-09-29</startDate><endDate>2020-09-26</endDate></period></context>
+<unit id="usd"><measure>iso4217:USD</measure></unit>
+<Revenue contextRef="D" unitRef="usd">1</Revenue>
+<Cash contextRef="I" unitRef="usd">2</Cash>
+<Shares contextRef="D" unitRef="undefined">3</Shares>
+<Orphan contextRef="X" unitRef="usd">4</Orphan>
+</xbrl>"""
+            )
+        statement_df = financial_statement.parse(instance_file)
+        # grouped by context, in the order each context is first used
+        self.assertEqual(
+            ["Revenue", "Shares", "Cash"], statement_df["attribute_name"].tolist()
+        )
+        self.assertEqual(["USD", None, "USD"], statement_df["unit"].tolist())
+
+    def test_parse_with_labels(self):
+        statement_df = financial_statement.parse(self.instance_file, with_labels=True)
+        labels = statement_df.set_index("attribute_name")["label"]
+        self.assertEqual(
+            "Liabilities and Equity", labels["LiabilitiesAndStockholdersEquity"]
+        )
+        self.assertIsNone(labels["GrossProfit"])
+
+    def test_labels_not_shared(self):
+        financial_statement.parse(self.instance_file, with_labels=True)
+
+        # another filing's wording never stands in for labels a filing doesn't have,
+        # even for us-gaap concepts
+        other_file = path.join(self.work_dir, "OTHER_10-K_20201030_000001.xml")
+        shutil.copy(self.instance_file, other_file)
+        statement_df = financial_statement.parse(other_file, with_labels=True)
+        self.assertTrue(statement_df["label"].isna().all())
+
+    def test_parse_statements(self):
+        structure_df = financial_statement.parse_statements(self.instance_file)
+        self.assertEqual({"CONSOLIDATEDBALANCESHEETS"}, set(structure_df["statement"]))
+        self.assertEqual(
+            [
+                "BalanceSheetAbstract",
+                "Assets",
+                "LiabilitiesAndStockholdersEquity",
+                "Liabilities",
+                "StockholdersEquity",
+            ],
+            structure_df["attribute_name"].tolist(),
+        )
+        self.assertEqual([0, 1, 1, 2, 2], structure_df["depth"].tolist())
+
+        liabilities = structure_df.set_index("attribute_name").loc["Liabilities"]
+        self.assertEqual("LiabilitiesAndStockholdersEquity", liabilities["parent"])
+        self.assertEqual(
+            "LiabilitiesAndStockholdersEquity", liabilities["calculation_parent"]
+        )
+        self.assertEqual(1.0, liabilities["weight"])
+        self.assertEqual("Balance Sheet [Abstract]", structure_df["label"].iloc[0])
+
+    def test_linkbase_cache(self):
+        first = financial_statement._load_linkbase(self.instance_file, "pre")
+        self.assertIs(
+            first, financial_statement._load_linkbase(self.instance_file, "pre")
+        )
+        self.assertIsNone(
+            financial_statement._load_linkbase(
+                path.join(self.work_dir, "missing.xml"), "pre"
+            )
+        )
+
+
+if __name__ == "__main__":
+    ut.main()
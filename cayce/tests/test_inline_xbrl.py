@@ -0,0 +1,113 @@
+import datetime as dt
+from os import path
+import shutil
+import tempfile
+import unittest as ut
+
+from lxml import etree
+
+from cayce.parsers import financial_statement, inline_xbrl
+from cayce.query import EdgarIndex
+
+_SUBMISSION_FILE = path.join(
+    path.dirname(__file__),
+    "fixtures/edgar/Archives/edgar/data/789019/0001564590-20-047996.txt",
+)
+
+
+class TestInlineXbrl(ut.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.work_dir = tempfile.mkdtemp()
+        with open(_SUBMISSION_FILE) as f:
+            file_content = f.read().split("\n")
+        payloads = EdgarIndex(cls.work_dir)._get_financial_statement_payloads(
+            file_content
+        )
+
+        cls.document_file = path.join(
+            cls.work_dir, "MICROSOFT_CORP_10-Q_20201027_047996.htm"
+        )
+        with open(cls.document_file, "w") as f:
+            f.write("\n".join(payloads["IXBRL"]))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.work_dir)
+
+    def test_parse(self):
+        statement_df = inline_xbrl.parse(self.document_file)
+        self.assertEqual(
+            ["period_start", "period_end", "attribute_name", "attribute_value", "unit"],
+            statement_df.columns.tolist(),
+        )
+        values = statement_df.set_index("attribute_name")["attribute_value"]
+
+        # scale, sign and format transforms; the server products segment is dropped
+        self.assertEqual(
+            37154000000.0, values["RevenueFromContractWithCustomerExcludingAssessedTax"]
+        )
+        self.assertEqual(-248000000.0, values["NonoperatingIncomeExpense"])
+        self.assertEqual(0.0, values["GoodwillImpairmentLoss"])
+        self.assertEqual(1.84, values["EarningsPerShareBasic"])
+        self.assertEqual(0.17, values["EffectiveIncomeTaxRateContinuingOperations"])
+        self.assertEqual(7561040000.0, values["EntityCommonStockSharesOutstanding"])
+        self.assertNotIn("PreferredStockValue", values)
+
+        # nonNumeric facts, including hidden ones and nested markup
+        self.assertEqual("10-Q", values["DocumentType"])
+        self.assertEqual("2020-09-30", values["DocumentPeriodEndDate"])
+        self.assertEqual("--06-30", values["CurrentFiscalYearEndDate"])
+        self.assertEqual("MICROSOFT CORPORATION", values["EntityRegistrantName"])
+        self.assertEqual(
+            "Our effective tax rate was 17%.", values["IncomeTaxDisclosureTextBlock"]
+        )
+
+        assets = statement_df.set_index("attribute_name").loc["Assets"]
+        self.assertIsNone(assets["period_start"])
+        self.assertEqual(dt.date(2020, 9, 30), assets["period_end"])
+        self.assertEqual("USD", assets["unit"])
+        self.assertEqual(
+            "USD/SHARES",
+            statement_df.set_index("attribute_name").loc[
+                "EarningsPerShareBasic", "unit"
+            ],
+        )
+
+    def test_parse_number(self):
+        for format_name, text, expected in [
+            ("ixt:num-dot-decimal", "1,234.5", 1234.5),
+            ("ixt:num-comma-decimal", "1.234,5", 1234.5),
+            ("ixt-sec:numunitdecimalin", "1,23,456 rupees 78 paise", 123456.78),
+            ("ixt:num-unit-decimal", "5 dollars 25 cents", 5.25),
+            ("ixt:num-unit-decimal", "1.234 euros", 1234.0),
+        ]:
+            element = etree.fromstring(
+                '<ix:nonFraction xmlns:ix="http://www.xbrl.org/2013/inlineXBRL" '
+                f'format="{format_name}">{text}</ix:nonFraction>'
+            )
+            self.assertEqual(expected, inline_xbrl._parse_number(element), text)
+
+    def test_parse_matches_instance_document(self):
+        # the same facts as a plain instance document give the same output
+        instance_file = path.join(self.work_dir, "instance.xml")
+        with open(instance_file, "w") as f:
+            f.write("""<?xml version="1.0" encoding="utf-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:us-gaap="http://fasb.org/us-gaap/2020-01-31">
+<xbrli:context id="C_0000789019_20200930">
+<xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000789019</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:instant>2020-09-30</xbrli:instant></xbrli:period>
+</xbrli:context>
+<xbrli:unit id="U_iso4217USD"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+<us-gaap:Assets contextRef="C_0000789019_20200930" unitRef="U_iso4217USD" decimals="-6">285449000000</us-gaap:Assets>
+</xbrli:xbrl>""")
+        instance_df = financial_statement.parse(instance_file)
+        inline_df = inline_xbrl.parse(self.document_file)
+        inline_df = inline_df[inline_df["attribute_name"] == "Assets"].reset_index(
+            drop=True
+        )
+        self.assertEqual(instance_df.values.tolist(), inline_df.values.tolist())
+
+
+if __name__ == "__main__":
+    ut.main()
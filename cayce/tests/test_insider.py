@@ -0,0 +1,142 @@
+import datetime as dt
+from os import path
+import unittest as ut
+
+import pandas as pd
+
+from cayce.insider import InsiderActivity
+from cayce.parsers import form4
+
+_FIXTURE_DIR = path.join(path.dirname(__file__), "fixtures")
+
+
+def _transactions(rows):
+    return pd.DataFrame(
+        rows, columns=["ticker", "owner", "transaction_date", "shares", "price"]
+    )
+
+
+class TestInsiderActivity(ut.TestCase):
+    def setUp(self):
+        self.activity = InsiderActivity(initial_capacity=2)
+        self.activity.update(
+            _transactions(
+                [
+                    ["XYZ", "ALICE", dt.date(2021, 3, 1), 100.0, 10.0],
+                    ["XYZ", "BOB", dt.date(2021, 3, 3), 200.0, 11.0],
+                    ["XYZ", "ALICE", dt.date(2021, 3, 9), -50.0, 12.0],
+                    ["ABC", "CAROL", dt.date(2021, 3, 2), 1000.0, None],
+                ]
+            ),
+            filing_id="batch-1",
+        )
+        # out of order dates, spread across another update
+        self.activity.update(
+            _transactions([["XYZ", "DAVE", dt.date(2021, 2, 28), 10.0, 9.0]]),
+            filing_id="batch-2",
+        )
+
+    def test_update(self):
+        self.assertEqual(5, len(self.activity))
+        # the same filing is only counted once
+        self.assertEqual(
+            0,
+            self.activity.update(
+                _transactions([["XYZ", "DAVE", dt.date(2021, 2, 28), 10.0, 9.0]]),
+                filing_id="batch-2",
+            ),
+        )
+        self.assertEqual(5, len(self.activity))
+
+    def test_parsed_form4(self):
+        activity = InsiderActivity()
+        activity.update(form4.parse(path.join(_FIXTURE_DIR, "form4.xml")))
+        positions_df = activity.positions()
+        self.assertEqual(["AAPL"], positions_df["ticker"].tolist())
+        self.assertEqual(["LEVINSON ARTHUR D"], positions_df["owner"].tolist())
+        self.assertEqual(
+            ["S", "P"],
+            form4.parse(path.join(_FIXTURE_DIR, "form4.xml"))[
+                "transaction_code"
+            ].tolist(),
+        )
+        self.assertEqual([-49000.0], positions_df["net_shares"].tolist())
+        self.assertAlmostEqual(
+            -50000 * 108.77 + 1000 * 109.5, positions_df["net_value"][0]
+        )
+
+    def test_positions(self):
+        positions_df = self.activity.positions().set_index(["ticker", "owner"])
+        self.assertEqual(50.0, positions_df.loc[("XYZ", "ALICE"), "net_shares"])
+        self.assertEqual(400.0, positions_df.loc[("XYZ", "ALICE"), "net_value"])
+        self.assertEqual(
+            dt.date(2021, 3, 9),
+            positions_df.loc[("XYZ", "ALICE"), "last_transaction_date"],
+        )
+        # no price, no dollar value
+        self.assertEqual(0.0, positions_df.loc[("ABC", "CAROL"), "net_value"])
+
+    def test_net_activity(self):
+        activity_df = self.activity.net_activity(
+            dt.date(2021, 3, 1), dt.date(2021, 3, 9)
+        )
+        activity_df = activity_df.set_index("ticker")
+        self.assertEqual(250.0, activity_df.loc["XYZ", "net_shares"])
+        self.assertEqual(300.0, activity_df.loc["XYZ", "bought_shares"])
+        self.assertEqual(50.0, activity_df.loc["XYZ", "sold_shares"])
+        self.assertEqual(3, activity_df.loc["XYZ", "transactions"])
+        self.assertEqual(1000.0, activity_df.loc["ABC", "net_shares"])
+
+        by_owner_df = self.activity.net_activity(by_owner=True).set_index(
+            ["ticker", "owner"]
+        )
+        self.assertEqual(4, len(by_owner_df))
+        self.assertEqual(10.0, by_owner_df.loc[("XYZ", "DAVE"), "net_shares"])
+
+        self.assertEqual(0, len(self.activity.net_activity(dt.date(2022, 1, 1))))
+
+    def test_weekly_net(self):
+        weekly_df = self.activity.weekly_net()
+        xyz_df = weekly_df[weekly_df["ticker"] == "XYZ"].set_index("week_start")
+        # 2021-02-28 is a Sunday, so belongs to the week of Monday 2021-02-22
+        self.assertEqual(10.0, xyz_df.loc[dt.date(2021, 2, 22), "net_shares"])
+        self.assertEqual(300.0, xyz_df.loc[dt.date(2021, 3, 1), "net_shares"])
+        self.assertEqual(-50.0, xyz_df.loc[dt.date(2021, 3, 8), "net_shares"])
+
+    def test_cluster_buys(self):
+        signals_df = self.activity.cluster_buys(window_days=7, min_owners=3)
+        self.assertEqual(["XYZ"], signals_df["ticker"].tolist())
+        self.assertEqual([dt.date(2021, 3, 3)], signals_df["window_end"].tolist())
+        self.assertEqual([3], signals_df["buyers"].tolist())
+        self.assertEqual([310.0], signals_df["bought_shares"].tolist())
+
+        self.assertEqual(
+            0, len(self.activity.cluster_buys(window_days=2, min_owners=3))
+        )
+        self.assertRaises(ValueError, self.activity.cluster_buys, window_days=0)
+
+    def test_cluster_buys_transaction_codes(self):
+        activity = InsiderActivity()
+        transactions_df = _transactions(
+            [
+                # annual grants to every director aren't buys
+                ["XYZ", "ALICE", dt.date(2021, 3, 1), 100.0, None],
+                ["XYZ", "BOB", dt.date(2021, 3, 1), 100.0, None],
+                ["XYZ", "CAROL", dt.date(2021, 3, 1), 100.0, None],
+                ["XYZ", "ALICE", dt.date(2021, 3, 2), 10.0, 10.0],
+                ["XYZ", "BOB", dt.date(2021, 3, 3), 20.0, 10.0],
+                # nor is exercising options
+                ["XYZ", "CAROL", dt.date(2021, 3, 3), 30.0, 5.0],
+            ]
+        )
+        transactions_df["transaction_code"] = ["A", "A", "A", "P", "P", "M"]
+        activity.update(transactions_df)
+        self.assertEqual(0, len(activity.cluster_buys(window_days=7, min_owners=3)))
+
+        signals_df = activity.cluster_buys(window_days=7, min_owners=2)
+        self.assertEqual([dt.date(2021, 3, 3)], signals_df["window_end"].tolist())
+        self.assertEqual([30.0], signals_df["bought_shares"].tolist())
+
+
+if __name__ == "__main__":
+    ut.main()
@@ -0,0 +1,74 @@
+import io
+from os import makedirs, path
+import shutil
+import tempfile
+import unittest as ut
+import zipfile
+
+from cayce.mock_edgar import MockEdgarServer
+from cayce import web
+
+
+class TestMockEdgar(ut.TestCase):
+    def setUp(self):
+        self.base_url = web._base_url
+        self.server = MockEdgarServer(retry_after=0, seed=42)
+        web.set_base_url(self.server.start())
+
+    def tearDown(self):
+        self.server.stop()
+        web.set_base_url(self.base_url)
+
+    def test_serves_fixtures(self):
+        response = web.get(web.url("include/ticker.txt"))
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b"aapl\t320193", response.content)
+
+        self.assertEqual(404, web.get(web.url("include/missing.txt")).status_code)
+        self.assertEqual(404, web.get(web.url("../mock_edgar.py")).status_code)
+
+    def test_stays_in_fixture_dir(self):
+        root_dir = tempfile.mkdtemp()
+        try:
+            for name in ["edgar", "edgar2"]:
+                makedirs(path.join(root_dir, name))
+                with open(path.join(root_dir, name, "ticker.txt"), "w") as f:
+                    f.write(name)
+
+            server = MockEdgarServer(path.join(root_dir, "edgar"))
+            self.assertEqual(b"edgar", server._read_fixture("/ticker.txt"))
+            # a sibling directory sharing the fixture directory's name as a prefix
+            self.assertIsNone(server._read_fixture("/../edgar2/ticker.txt"))
+        finally:
+            shutil.rmtree(root_dir)
+
+    def test_zips_company_idx(self):
+        response = web.get(web.url("Archives/edgar/full-index/2020/QTR4/company.zip"))
+        self.assertEqual(200, response.status_code)
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zipped:
+            self.assertEqual(["company.idx"], zipped.namelist())
+
+    def test_throttling_is_retried(self):
+        self.server.throttle_rate = 0.5
+        for _ in range(10):
+            response = web.get(web.url("include/ticker.txt"), max_retries=20)
+            self.assertEqual(200, response.status_code)
+        self.assertEqual(10, self.server.stats[200])
+        self.assertGreater(self.server.stats[429], 0)
+
+        # without retries, a throttled response is handed back to the caller
+        self.server.throttle_rate = 1.0
+        response = web.get(web.url("include/ticker.txt"), max_retries=0)
+        self.assertEqual(429, response.status_code)
+
+    def test_rate_limit(self):
+        self.server.rate_limit = 3
+        statuses = [
+            web.get(web.url("include/ticker.txt"), max_retries=0).status_code
+            for _ in range(5)
+        ]
+        self.assertEqual([200, 200, 200, 429, 429], statuses)
+
+
+if __name__ == "__main__":
+    ut.main()
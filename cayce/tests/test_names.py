@@ -0,0 +1,40 @@
+import unittest as ut
+
+from cayce.names import normalize_name, CompanyNameIndex
+
+
+class TestNames(ut.TestCase):
+    def test_normalize_name(self):
+        self.assertEqual("APPLE", normalize_name("Apple Inc."))
+        self.assertEqual("APPLE", normalize_name("APPLE INC /CA/"))
+        self.assertEqual("APPLE COMPUTER", normalize_name("APPLE COMPUTER INC"))
+        self.assertEqual("AT T", normalize_name("AT&T Corp"))
+        self.assertEqual("", normalize_name("The Company, Inc."))
+
+    def test_search(self):
+        index = CompanyNameIndex()
+        index.add(
+            [
+                "APPLE INC",
+                "APPLE COMPUTER INC",
+                "APPLE HOSPITALITY REIT, INC.",
+                "MICROSOFT CORP",
+            ],
+            ["320193", "320193", "1418121", "789019"],
+        )
+        # re-adding the same names for the same CIK is a no-op
+        index.add(["APPLE INC."], ["320193"])
+        self.assertEqual(4, len(index))
+
+        matches = index.search("Apple Inc", min_score=0.1)
+        self.assertEqual(("320193", "APPLE INC", 1.0), matches[0])
+        # each CIK is only listed once
+        self.assertEqual(["320193", "1418121"], [match[0] for match in matches])
+
+        self.assertEqual("789019", index.search("microsft", min_score=0.2)[0][0])
+        self.assertEqual([], index.search("zzzz"))
+        self.assertEqual(1, len(index.search("apple", limit=1)))
+
+
+if __name__ == "__main__":
+    ut.main()
@@ -1,13 +1,530 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime as dt
+import glob
+import os
+from os import path, remove
+import shutil
+import tempfile
 import unittest as ut
+from unittest import mock
+import zipfile
 
+import pandas as pd
+import requests
+
+from cayce.mock_edgar import MockEdgarServer
 import cayce.query as q
+from cayce import web
+
+_EDGAR_FIXTURE_DIR = path.join(path.dirname(__file__), "fixtures", "edgar")
 
 
 class TestQuery(ut.TestCase):
+    def setUp(self):
+        # tests point web at a mock server; put back whatever the run started with
+        self.base_url = web._base_url
+
+    def tearDown(self):
+        web.set_base_url(self.base_url)
+
     def test__process_company_idx(self):
-        # TODO: generate a small index file that I can validate against
-        pass
+        cache_dir = tempfile.mkdtemp()
+        try:
+            zip_file = path.join(cache_dir, "2020-4-index.zip")
+            with zipfile.ZipFile(zip_file, "w") as zipped:
+                zipped.write(
+                    path.join(
+                        _EDGAR_FIXTURE_DIR,
+                        "Archives/edgar/full-index/2020/QTR4/company.idx",
+                    ),
+                    "company.idx",
+                )
+
+            index = q.EdgarIndex(cache_dir)
+            index_df = index._process_company_idx(zip_file)
+        finally:
+            shutil.rmtree(cache_dir)
+
+        self.assertEqual(5, len(index_df))
+        self.assertEqual(
+            [
+                "APPLE INC",
+                "10-K",
+                "320193",
+                "2020-10-30",
+                "edgar/data/320193/0000320193-20-000096.txt",
+            ],
+            index_df.iloc[0].tolist(),
+        )
+        self.assertEqual("APPLE HOSPITALITY REIT, INC.", index_df["company"].iloc[2])
+
+    def test_search_offline(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                index = q.EdgarIndex(cache_dir)
+                result_df = index.search(
+                    dt.date(2020, 10, 1), dt.date(2020, 12, 31), ciks="320193"
+                )
+                self.assertEqual(["10-K", "4"], result_df["form_type"].tolist())
+                self.assertEqual(1, server.stats[200])
+
+                # the quarter is now held in memory, so searching again is free
+                result_df = index.search(
+                    dt.date(2020, 10, 1), dt.date(2020, 12, 31), form_types="10-Q"
+                )
+                self.assertEqual(["MICROSOFT CORP"], result_df["company"].tolist())
+                self.assertEqual(1, server.stats[200])
+
+                # ... and its company.zip is cached on disk for the next EdgarIndex
+                self.assertTrue(path.exists(path.join(cache_dir, "2020-4-index.zip")))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_search_partial_quarter(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                index = q.EdgarIndex(cache_dir)
+                index.search(dt.date(2020, 11, 1), dt.date(2020, 11, 5))
+                self.assertEqual(dt.date(2020, 10, 1), index._snapshot.min_date)
+                self.assertEqual(dt.date(2020, 12, 31), index._snapshot.max_date)
+
+                # other days in the same quarter were loaded along with it
+                result_df = index.search(dt.date(2020, 10, 1), dt.date(2020, 10, 31))
+                self.assertEqual(["10-K", "10-Q"], result_df["form_type"].tolist())
+                self.assertEqual(5, len(index))
+                self.assertEqual(1, server.stats[200])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_download_xbrl_offline(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                index = q.EdgarIndex(cache_dir)
+                record = [
+                    "APPLE INC",
+                    "10-K",
+                    "320193",
+                    pd.Timestamp(2020, 10, 30),
+                    "edgar/data/320193/0000320193-20-000096.txt",
+                ]
+                xbrl_file = index.download_xbrl(record)
+                self.assertEqual(
+                    "APPLE_INC_10-K_20201030_0000320193-20-000096.xml",
+                    path.basename(xbrl_file),
+                )
+                with open(xbrl_file) as f:
+                    content = f.read()
+                self.assertTrue(content.startswith("<?xml"))
+                self.assertIn(
+                    "RevenueFromContractWithCustomerExcludingAssessedTax", content
+                )
+                self.assertNotIn("<XBRL>", content)
+                for kind in ["cal", "pre", "lab"]:
+                    with open(xbrl_file[: -len(".xml")] + f".{kind}.xml") as f:
+                        self.assertTrue(f.read().startswith("<?xml"))
+
+                # inline XBRL filings keep the primary document instead
+                inline_file = index.download_xbrl(
+                    [
+                        "MICROSOFT CORP",
+                        "10-Q",
+                        "789019",
+                        pd.Timestamp(2020, 10, 27),
+                        "edgar/data/789019/0001564590-20-047996.txt",
+                    ]
+                )
+                self.assertEqual(
+                    "MICROSOFT_CORP_10-Q_20201027_0001564590-20-047996.htm",
+                    path.basename(inline_file),
+                )
+                with open(inline_file) as f:
+                    content = f.read()
+                self.assertIn("<ix:header>", content)
+                self.assertNotIn("Certification", content)
+
+                record[1] = "4"
+                record[4] = "edgar/data/320193/0001209191-20-055218.txt"
+                form4_file = index.download_xbrl(record)
+                with open(form4_file) as f:
+                    self.assertIn("<issuerTradingSymbol>AAPL", f.read())
+
+                record[4] = "edgar/data/320193/0000000000-20-000000.txt"
+                self.assertRaises(requests.HTTPError, index.download_xbrl, record)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_download_xbrl_selective(self):
+        work_dir = tempfile.mkdtemp()
+        try:
+            # without the full submissions, only the documents listed on each index page can be used
+            fixture_dir = path.join(work_dir, "edgar")
+            shutil.copytree(_EDGAR_FIXTURE_DIR, fixture_dir)
+            submission_dir = path.join(fixture_dir, "Archives/edgar/data/320193")
+            for file_name in glob.glob(path.join(submission_dir, "*.txt")):
+                shutil.move(file_name, work_dir)
+
+            with MockEdgarServer(fixture_dir) as server:
+                web.set_base_url(server.url)
+                index = q.EdgarIndex(path.join(work_dir, "cache"))
+                record = [
+                    "APPLE INC",
+                    "10-K",
+                    "320193",
+                    pd.Timestamp(2020, 10, 30),
+                    "edgar/data/320193/0000320193-20-000096.txt",
+                ]
+                xbrl_file = index.download_xbrl(record)
+                # the index page, the instance and three linkbases, but not the 10-K itself
+                self.assertEqual(5, server.stats[200])
+                self.assertEqual(0, server.stats[404])
+
+                form4_record = [
+                    "APPLE INC",
+                    "4",
+                    "320193",
+                    pd.Timestamp(2020, 11, 4),
+                    "edgar/data/320193/0001209191-20-055218.txt",
+                ]
+                form4_file = index.download_xbrl(form4_record)
+
+                # ... which gives the same files as picking through the full submission
+                for file_name in glob.glob(path.join(work_dir, "*.txt")):
+                    shutil.move(file_name, submission_dir)
+                full_index = q.EdgarIndex(path.join(work_dir, "full_cache"))
+                for local_file, full_file in [
+                    (xbrl_file, full_index.download_xbrl(record, selective=False)),
+                    (
+                        form4_file,
+                        full_index.download_xbrl(form4_record, selective=False),
+                    ),
+                ]:
+                    self.assertEqual(
+                        path.basename(full_file), path.basename(local_file)
+                    )
+                    with open(local_file) as f, open(full_file) as g:
+                        self.assertEqual(g.read().strip(), f.read().strip())
+        finally:
+            shutil.rmtree(work_dir)
+
+    def test__parse_filing_index(self):
+        with open(
+            path.join(
+                _EDGAR_FIXTURE_DIR,
+                "Archives/edgar/data/320193/000120919120055218/0001209191-20-055218-index.htm",
+            ),
+            "rb",
+        ) as f:
+            documents = q._parse_filing_index(f.read())
+        self.assertEqual(
+            [
+                "/Archives/edgar/data/320193/000120919120055218/xslF345X03/doc4.xml",
+                "/Archives/edgar/data/320193/000120919120055218/doc4.xml",
+            ],
+            [href for _, _, href, _ in documents],
+        )
+        self.assertEqual(
+            [None, "PRIMARY"],
+            [q._classify_document("4", *document) for document in documents],
+        )
+
+        # inline XBRL primary documents link through the viewer
+        self.assertEqual(
+            "IXBRL",
+            q._classify_document(
+                "10-Q",
+                "10-Q",
+                "msft-10q_20200930.htm iXBRL",
+                "/Archives/edgar/data/789019/000156459020047996/msft-10q_20200930.htm",
+                "10-Q",
+            ),
+        )
+        self.assertEqual(
+            "INS",
+            q._classify_document(
+                "10-Q",
+                "EXTRACTED XBRL INSTANCE DOCUMENT",
+                "msft-10q_20200930_htm.xml",
+                "/Archives/edgar/data/789019/000156459020047996/msft-10q_20200930_htm.xml",
+                "XML",
+            ),
+        )
+
+    def test__compact_index(self):
+        raw_df = pd.DataFrame(
+            [
+                [
+                    "APPLE INC",
+                    "10-K",
+                    "320193",
+                    "2020-10-30",
+                    "edgar/data/320193/0000320193-20-000096.txt",
+                ],
+                [
+                    "APPLE INC",
+                    "4",
+                    "320193",
+                    "2020-11-04",
+                    "edgar/data/320193/0001209191-20-055218.txt",
+                ],
+                [
+                    "BAD ROW",
+                    "4",
+                    "1",
+                    "2020-11-04",
+                    "edgar/data/1/not-an-accession.txt",
+                ],
+            ],
+            columns=["company", "form_type", "cik", "date_filed", "file_name"],
+        )
+        compact_df = q._compact_index(raw_df)
+        # rows with an unrecognized file name are kept, file name and all
+        self.assertEqual(3, len(compact_df))
+        self.assertEqual("category", compact_df["company"].dtype.name)
+        self.assertEqual("int64", compact_df["cik"].dtype.name)
+        self.assertEqual(120919120055218, compact_df["accession"].iloc[1])
+        self.assertEqual([False, False, True], compact_df["file_name"].notna().tolist())
+
+        expanded_df = q._expand_index(compact_df)
+        expected_df = raw_df.copy()
+        expected_df["date_filed"] = pd.to_datetime(expected_df["date_filed"])
+        pd.testing.assert_frame_equal(expected_df, expanded_df)
+
+        # the whole point: should be a fraction of the size of the raw strings
+        big_raw_df = pd.concat([raw_df.iloc[:2]] * 1000, ignore_index=True)
+        self.assertLess(
+            q._compact_index(big_raw_df).memory_usage(deep=True).sum() * 3,
+            big_raw_df.memory_usage(deep=True).sum(),
+        )
+
+    def test_lazy_index_load(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache_file = path.join(cache_dir, "edgar_filings.idx")
+            with open(cache_file, "w") as f:
+                f.write("company,form_type,cik,date_filed,file_name\n")
+                f.write(
+                    "APPLE INC,10-K,320193,2020-10-30,edgar/data/320193/0000320193-20-000096.txt\n"
+                )
+
+            index = q.EdgarIndex(cache_dir)
+            self.assertIsNone(index._snapshot)
+
+            snapshot = index._load_index()
+            self.assertIs(snapshot, index._snapshot)
+            self.assertEqual(1, len(index._index))
+            self.assertEqual(320193, index._index["cik"].iloc[0])
+            # the cached quarter is covered, start to end
+            self.assertEqual(dt.date(2020, 10, 1), snapshot.min_date)
+            self.assertEqual(dt.date(2020, 12, 31), snapshot.max_date)
+
+            # an index that was never loaded must not overwrite the cache
+            unused_index = q.EdgarIndex(cache_dir)
+            unused_index.close()
+            with open(cache_file) as f:
+                self.assertEqual(2, len(f.readlines()))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_lazy_index_load_unrecognized(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with open(path.join(cache_dir, "edgar_filings.idx"), "w") as f:
+                f.write("company,form_type,cik,date_filed,file_name\n")
+                f.write("APPLE INC,10-K,320193,2020-10-30,edgar/data/320193/bad.txt\n")
+
+            # nothing is lost, even though the file name isn't one we recognize
+            index = q.EdgarIndex(cache_dir, auto_flush=False)
+            self.assertEqual(1, len(index))
+            result_df = index.search(dt.date(2020, 10, 1), dt.date(2020, 12, 31))
+            self.assertEqual(
+                ["edgar/data/320193/bad.txt"], result_df["file_name"].tolist()
+            )
+
+            index.flush()
+            with open(path.join(cache_dir, "edgar_filings.idx")) as f:
+                self.assertIn("edgar/data/320193/bad.txt", f.read())
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_multi_quarter_index(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                with open(path.join(cache_dir, "edgar_filings.idx"), "w") as f:
+                    f.write("company,form_type,cik,date_filed,file_name\n")
+                    f.write(
+                        "APPLE INC,10-Q,320193,2020-07-31,edgar/data/320193/0000320193-20-000062.txt\n"
+                    )
+
+                index = q.EdgarIndex(cache_dir, auto_flush=False)
+                index.search(dt.date(2020, 7, 1), dt.date(2020, 12, 31))
+                self.assertEqual(2, len(index._snapshot.chunks))
+
+                # quarters are consolidated without decoding the dictionary encoded columns
+                index_df = index._index
+                self.assertEqual(6, len(index_df))
+                self.assertEqual("category", index_df["company"].dtype.name)
+                self.assertEqual("category", index_df["form_type"].dtype.name)
+                result_df = index.search(
+                    dt.date(2020, 7, 1), dt.date(2020, 12, 31), ciks="320193"
+                )
+                self.assertEqual(["10-Q", "10-K", "4"], result_df["form_type"].tolist())
+
+                # saved a few rows at a time, chunk by chunk, and read back the same
+                with mock.patch.object(q, "_FLUSH_BATCH_ROWS", 2):
+                    index.flush()
+                reloaded_df = q.EdgarIndex(cache_dir).search(
+                    dt.date(2020, 7, 1), dt.date(2020, 12, 31)
+                )
+                pd.testing.assert_frame_equal(
+                    index.search(dt.date(2020, 7, 1), dt.date(2020, 12, 31)),
+                    reloaded_df,
+                )
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_partial_quarter_refetched(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                # left behind part way through the quarter, eg by a process that crashed
+                zip_file = path.join(cache_dir, "2020-4-index.zip")
+                with open(zip_file, "wb") as f:
+                    f.write(b"partial")
+                written = dt.datetime(2020, 11, 1).timestamp()
+                os.utime(zip_file, (written, written))
+
+                index = q.EdgarIndex(cache_dir)
+                index.search(dt.date(2020, 10, 1), dt.date(2020, 12, 31))
+                self.assertEqual(5, len(index))
+                self.assertEqual(1, server.stats[200])
+
+                # a quarter loaded while still open is replaced once a search reaches past it
+                index = q.EdgarIndex(cache_dir, auto_flush=False)
+                closed_chunk, open_chunk = [
+                    q._compact_index(pd.DataFrame([row], columns=q._INDEX_COLUMNS))
+                    for row in [
+                        [
+                            "APPLE INC",
+                            "10-Q",
+                            "320193",
+                            "2020-07-31",
+                            "edgar/data/320193/0000320193-20-000062.txt",
+                        ],
+                        [
+                            "APPLE INC",
+                            "10-K",
+                            "320193",
+                            "2020-10-30",
+                            "edgar/data/320193/0000320193-20-000096.txt",
+                        ],
+                    ]
+                ]
+                index._snapshot = q._Snapshot(
+                    (closed_chunk, open_chunk),
+                    dt.date(2020, 7, 1),
+                    dt.date(2020, 11, 1),
+                )
+                # the open quarter is kept apart when the rest is consolidated
+                self.assertEqual(2, len(index._index))
+                self.assertIs(open_chunk, index._snapshot.chunks[-1])
+
+                result_df = index.search(dt.date(2020, 10, 1), dt.date(2020, 12, 31))
+                self.assertEqual(6, len(index))
+                self.assertEqual(5, len(result_df))
+                self.assertEqual(dt.date(2020, 12, 31), index._snapshot.max_date)
+                # completed quarters are reused as they are, without being copied
+                self.assertIs(closed_chunk, index._snapshot.chunks[0])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_flush(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer() as server:
+                web.set_base_url(server.url)
+                cache_file = path.join(cache_dir, "edgar_filings.idx")
+
+                with q.EdgarIndex(cache_dir, auto_flush=False) as index:
+                    index.search(dt.date(2020, 10, 1), dt.date(2020, 12, 31))
+                    self.assertFalse(path.exists(cache_file))
+                    index.flush()
+                    self.assertTrue(path.exists(cache_file))
+                self.assertEqual(
+                    [], glob.glob(path.join(cache_dir, ".edgar_filings.*"))
+                )
+
+                # refreshing a completed quarter checkpoints the index straight away
+                remove(cache_file)
+                index = q.EdgarIndex(cache_dir)
+                index.search(dt.date(2020, 10, 1), dt.date(2020, 12, 31))
+                self.assertTrue(path.exists(cache_file))
+
+                reloaded_index = q.EdgarIndex(cache_dir)
+                self.assertEqual(5, len(reloaded_index))
+                result_df = reloaded_index.search(
+                    dt.date(2020, 10, 1), dt.date(2020, 12, 31), ciks="789019"
+                )
+                self.assertEqual(["MICROSOFT CORP"], result_df["company"].tolist())
+                # ... and EDGAR was only asked for the quarter once
+                self.assertEqual(1, server.stats[200])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_concurrent_search(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with MockEdgarServer(latency=0.05) as server:
+                web.set_base_url(server.url)
+                index = q.EdgarIndex(cache_dir)
+
+                def _search(cik):
+                    return index.search(
+                        dt.date(2020, 10, 1), dt.date(2020, 12, 31), ciks=cik
+                    )["company"].tolist()
+
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    results = list(executor.map(_search, ["320193", "789019"] * 8))
+
+                self.assertEqual(
+                    [["APPLE INC", "APPLE INC"], ["MICROSOFT CORP"]] * 8, results
+                )
+                # the quarter was only downloaded and added once
+                self.assertEqual(1, server.stats[200])
+                self.assertEqual(5, len(index))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_search_companies(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with open(path.join(cache_dir, "edgar_filings.idx"), "w") as f:
+                f.write("company,form_type,cik,date_filed,file_name\n")
+                f.write(
+                    "APPLE INC,10-K,320193,2020-10-30,edgar/data/320193/0000320193-20-000096.txt\n"
+                )
+                f.write(
+                    "APPLE INC,10-Q,320193,2020-07-31,edgar/data/320193/0000320193-20-000062.txt\n"
+                )
+                f.write(
+                    "MICROSOFT CORP,10-K,789019,2020-07-31,edgar/data/789019/0001564590-20-034944.txt\n"
+                )
+
+            index = q.EdgarIndex(cache_dir)
+            result_df = index.search_companies("Apple, Inc.")
+            self.assertEqual(["320193"], result_df["cik"].tolist())
+            self.assertEqual(1.0, result_df["score"].iloc[0])
+            self.assertEqual(2, len(index._name_index))
+        finally:
+            shutil.rmtree(cache_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+import datetime as dt
+import glob
+from os import makedirs, path
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest as ut
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from cayce.mock_edgar import MockEdgarServer
+import cayce.query as q
+import cayce.shared_index as si
+from cayce.shared_index import SharedEdgarIndex, export_index
+from cayce import web
+
+
+class TestSharedIndex(ut.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = path.join(self.work_dir, "cache")
+        self.shared_dir = path.join(self.work_dir, "shared")
+        makedirs(self.cache_dir)
+        with open(path.join(self.cache_dir, "edgar_filings.idx"), "w") as f:
+            f.write("company,form_type,cik,date_filed,file_name\n")
+            f.write(
+                "APPLE INC,4,320193,2020-11-04,edgar/data/320193/0001209191-20-055218.txt\n"
+            )
+            f.write(
+                "APPLE INC,10-K,320193,2020-10-30,edgar/data/320193/0000320193-20-000096.txt\n"
+            )
+            f.write(
+                "MICROSOFT CORP,10-Q,789019,2020-10-27,edgar/data/789019/0001564590-20-047996.txt\n"
+            )
+            f.write(
+                "MICROSOFT CORP,10-K,789019,2020-07-30,edgar/data/789019/0001564590-20-034944.txt\n"
+            )
+        self.index = q.EdgarIndex(self.cache_dir)
+        self.base_url = web._base_url
+
+    def tearDown(self):
+        web.set_base_url(self.base_url)
+        shutil.rmtree(self.work_dir)
+
+    def test_search(self):
+        export_index(self.index, self.shared_dir)
+        shared_index = SharedEdgarIndex(self.shared_dir)
+        self.assertEqual(4, len(shared_index))
+
+        # the columns are mapped straight from disk, and can't be changed
+        cik = shared_index._attached.columns["cik"]
+        self.assertIsInstance(cik, np.memmap)
+        self.assertFalse(cik.flags.writeable)
+
+        for kwargs in [
+            {},
+            {"ciks": "320193"},
+            {"form_types": ["10-K", "10-Q"]},
+            {"form_types": "S-1"},
+            {"start_date": dt.date(2020, 10, 28), "end_date": dt.date(2020, 11, 4)},
+            {"start_date": dt.date(2020, 10, 1), "ciks": ["789019"]},
+            # a CIK that isn't a number matches nothing, rather than raising
+            {"ciks": "not-a-cik"},
+            {"ciks": ["0000320193", "CIK320193"]},
+        ]:
+            kwargs = {"start_date": dt.date(2020, 7, 1), **kwargs}
+            kwargs.setdefault("end_date", dt.date(2020, 12, 31))
+            expected_df = (
+                self.index.search(**kwargs)
+                .sort_values("date_filed", kind="stable")
+                .reset_index(drop=True)
+            )
+            pd.testing.assert_frame_equal(expected_df, shared_index.search(**kwargs))
+
+        self.assertEqual(
+            0, len(shared_index.search(dt.date(2020, 7, 1), ciks="not-a-cik"))
+        )
+        self.assertEqual(
+            ["10-K", "4"],
+            shared_index.search(dt.date(2020, 7, 1), ciks=["x", "0000320193"])[
+                "form_type"
+            ].tolist(),
+        )
+
+    def test_export_empty(self):
+        empty_dir = path.join(self.work_dir, "empty")
+        makedirs(empty_dir)
+        self.assertRaises(
+            ValueError, export_index, q.EdgarIndex(empty_dir), self.shared_dir
+        )
+        self.assertFalse(path.exists(self.shared_dir))
+
+    def test_reload(self):
+        first_generation = export_index(self.index, self.shared_dir)
+        shared_index = SharedEdgarIndex(self.shared_dir)
+        self.assertFalse(shared_index.reload())
+
+        second_generation = export_index(self.index, self.shared_dir)
+        self.assertNotEqual(first_generation, second_generation)
+        # the previous generation is kept for processes that have only just read index.json
+        self.assertEqual(
+            9, len(glob.glob(path.join(self.shared_dir, f"*.{first_generation}.npy")))
+        )
+
+        third_generation = export_index(self.index, self.shared_dir)
+        # older files are gone, but are still readable through the existing mapping
+        self.assertEqual(
+            [],
+            glob.glob(path.join(self.shared_dir, f"*.{first_generation}.npy")),
+        )
+        self.assertEqual(4, len(shared_index.search(dt.date(2020, 7, 1))))
+
+        self.assertTrue(shared_index.reload())
+        self.assertEqual(third_generation, shared_index._attached.generation)
+
+    def test_reload_superseded(self):
+        export_index(self.index, self.shared_dir)
+        stale_meta = si._read_meta(self.shared_dir)
+        export_index(self.index, self.shared_dir)
+        latest_generation = export_index(self.index, self.shared_dir)
+
+        # index.json was read just before two more exports removed the generation it names
+        with mock.patch.object(
+            si, "_read_meta", side_effect=[stale_meta, si._read_meta(self.shared_dir)]
+        ):
+            shared_index = SharedEdgarIndex(self.shared_dir)
+        self.assertEqual(latest_generation, shared_index._attached.generation)
+        self.assertEqual(4, len(shared_index))
+
+    def test_multi_quarter_export(self):
+        cache_dir = path.join(self.work_dir, "multi_quarter")
+        makedirs(cache_dir)
+        with open(path.join(cache_dir, "edgar_filings.idx"), "w") as f:
+            f.write("company,form_type,cik,date_filed,file_name\n")
+            f.write(
+                "APPLE INC,10-Q,320193,2020-07-31,edgar/data/320193/0000320193-20-000062.txt\n"
+            )
+            # exported as it is, since it can't be reduced to an accession number
+            f.write("OLD CO,10-K,1,2020-08-03,edgar/data/1/odd.txt\n")
+
+        with MockEdgarServer() as server:
+            web.set_base_url(server.url)
+            index = q.EdgarIndex(cache_dir, auto_flush=False)
+            # the cached third quarter, plus the fourth from the server
+            index.search(dt.date(2020, 7, 1), dt.date(2020, 12, 31))
+            self.assertEqual(2, len(index._snapshot.chunks))
+
+        export_index(index, self.shared_dir)
+        shared_index = SharedEdgarIndex(self.shared_dir)
+        self.assertEqual(7, len(shared_index))
+        for kwargs in [
+            {},
+            {"ciks": "320193"},
+            {"form_types": ["10-Q", "4"]},
+            {"ciks": "1"},
+        ]:
+            expected_df = (
+                index.search(dt.date(2020, 7, 1), dt.date(2020, 12, 31), **kwargs)
+                .sort_values("date_filed", kind="stable")
+                .reset_index(drop=True)
+            )
+            pd.testing.assert_frame_equal(
+                expected_df,
+                shared_index.search(
+                    dt.date(2020, 7, 1), dt.date(2020, 12, 31), **kwargs
+                ),
+            )
+
+    def test_attach_from_another_process(self):
+        export_index(self.index, self.shared_dir)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import datetime as dt; from cayce.shared_index import SharedEdgarIndex; "
+                f"index = SharedEdgarIndex({self.shared_dir!r}); "
+                "print(index.search(dt.date(2020, 7, 1), form_types='10-K')['file_name'].tolist())",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        self.assertIn(
+            "['edgar/data/789019/0001564590-20-034944.txt', "
+            "'edgar/data/320193/0000320193-20-000096.txt']",
+            output,
+        )
+
+
+if __name__ == "__main__":
+    ut.main()
@@ -1,10 +1,26 @@
 import datetime as dt
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 
+import numpy as np
 from numpy import NaN
 import pandas as pd
 
-from cayce.utils import ifna, is_leap_year, add_months, get_quarter, split_fixed_length
+from cayce.utils import (
+    lazy_import,
+    atomic_write,
+    ifna,
+    is_leap_year,
+    add_months,
+    get_quarter,
+    get_start_of_quarter,
+    get_end_of_quarter,
+    get_quarters,
+    split_fixed_length,
+)
 
 
 class TestUtils(unittest.TestCase):
@@ -36,6 +52,34 @@ class TestUtils(unittest.TestCase):
             split_fixed_length(test_string_2, [4, 4, 6, 5, 4], strip=False),
         )
 
+    def test_lazy_import(self):
+        self.assertIs(sys.modules["datetime"], lazy_import("datetime"))
+        self.assertRaises(ModuleNotFoundError, lazy_import, "cayce_no_such_module")
+
+        # not yet imported anywhere, so should come back deferred
+        sys.modules.pop("colorsys", None)
+        colorsys = lazy_import("colorsys")
+        self.assertIs(sys.modules["colorsys"], colorsys)
+        self.assertEqual((1.0, 1.0, 1.0), colorsys.hsv_to_rgb(0.0, 0.0, 1.0))
+
+    def test_atomic_write(self):
+        work_dir = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(work_dir, "data.csv")
+            with atomic_write(file_name) as f:
+                f.write("first")
+
+            # a failure part way through leaves the previous version, and no temp file
+            with self.assertRaises(RuntimeError):
+                with atomic_write(file_name) as f:
+                    f.write("second")
+                    raise RuntimeError()
+            with open(file_name) as f:
+                self.assertEqual("first", f.read())
+            self.assertEqual(["data.csv"], os.listdir(work_dir))
+        finally:
+            shutil.rmtree(work_dir)
+
     def test_ifna(self):
         self.assertEqual(1, ifna(1, 2))
         self.assertEqual(2, ifna(None, 2))
@@ -95,6 +139,62 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(4, get_quarter(dt.date(2020, 11, 1)))
         self.assertEqual(4, get_quarter(dt.date(2020, 12, 1)))
 
+    def test_vectorized_dates(self):
+        dates = [
+            dt.date(2020, 3, 31),
+            dt.date(2020, 1, 31),
+            dt.date(2019, 11, 30),
+            dt.date(2100, 2, 28),
+        ]
+        series = pd.Series(dates + [None], index=list("abcde"))
+        array = np.array(dates, dtype="datetime64[D]")
+
+        self.assertEqual(
+            [False, True, True, False],
+            is_leap_year(np.array([2100, 2000, 2020, 2021])).tolist(),
+        )
+
+        # same answers as the scalar versions, missing dates stay missing
+        for months in [-37, -1, 0, 1, 11, 47]:
+            expected = [add_months(date, months) for date in dates]
+            self.assertEqual(
+                expected, [d.date() for d in pd.to_datetime(add_months(array, months))]
+            )
+            shifted = add_months(series, months)
+            self.assertEqual(list("abcde"), shifted.index.tolist())
+            self.assertEqual(expected, shifted.dt.date.tolist()[:4])
+            self.assertTrue(pd.isna(shifted["e"]))
+
+        self.assertEqual(
+            [get_quarter(date) for date in dates], get_quarter(array).tolist()
+        )
+        self.assertEqual(
+            [get_start_of_quarter(date) for date in dates],
+            get_start_of_quarter(series).dt.date.tolist()[:4],
+        )
+        self.assertEqual(
+            [get_end_of_quarter(date) for date in dates],
+            [d.date() for d in pd.to_datetime(get_end_of_quarter(array))],
+        )
+
+    def test_get_quarters(self):
+        self.assertEqual(
+            dt.date(2020, 12, 31), get_end_of_quarter(dt.date(2020, 11, 3))
+        )
+        self.assertEqual(
+            [
+                dt.date(2019, 10, 1),
+                dt.date(2020, 1, 1),
+                dt.date(2020, 4, 1),
+            ],
+            get_quarters(dt.date(2019, 12, 31), dt.date(2020, 4, 1)),
+        )
+        self.assertEqual(
+            [dt.date(2020, 4, 1)],
+            get_quarters(dt.date(2020, 5, 1), dt.date(2020, 5, 2)),
+        )
+        self.assertEqual([], get_quarters(dt.date(2020, 5, 1), dt.date(2020, 3, 1)))
+
 
 if __name__ == "__main__":
     unittest.main()
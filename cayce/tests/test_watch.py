@@ -0,0 +1,124 @@
+import asyncio
+import datetime as dt
+from os import path
+import shutil
+import tempfile
+import unittest as ut
+
+import pandas as pd
+
+from cayce.mock_edgar import DEFAULT_FIXTURE_DIR, MockEdgarServer
+from cayce.watch import FilingWatcher
+from cayce import web
+
+_NEW_ENTRY = """<entry>
+<title>10-Q - APPLE INC (0000320193) (Filer)</title>
+<summary type="html"> &lt;b&gt;Filed:&lt;/b&gt; 2020-11-05 &lt;b&gt;AccNo:&lt;/b&gt; 0000320193-20-000100 &lt;b&gt;Size:&lt;/b&gt; 9 MB</summary>
+<updated>2020-11-05T09:00:00-05:00</updated>
+<category scheme="https://www.sec.gov/" label="form type" term="10-Q"/>
+<id>urn:tag:sec.gov,2008:accession-number=0000320193-20-000100</id>
+</entry>
+"""
+
+
+class TestWatch(ut.TestCase):
+    def setUp(self):
+        self.base_url = web._base_url
+        # a copy of the fixtures, so the feed can change under the watcher
+        self.fixture_dir = path.join(tempfile.mkdtemp(), "edgar")
+        shutil.copytree(DEFAULT_FIXTURE_DIR, self.fixture_dir)
+        self.feed_file = path.join(self.fixture_dir, "cgi-bin", "browse-edgar")
+        self.server = MockEdgarServer(self.fixture_dir)
+        web.set_base_url(self.server.start())
+
+    def tearDown(self):
+        self.server.stop()
+        web.set_base_url(self.base_url)
+        shutil.rmtree(path.dirname(self.fixture_dir))
+
+    def _add_feed_entry(self, entry: str):
+        with open(self.feed_file) as f:
+            content = f.read()
+        with open(self.feed_file, "w") as f:
+            f.write(content.replace("<entry>", entry + "<entry>", 1))
+
+    def test_poll(self):
+        watcher = FilingWatcher()
+        records = watcher.poll()
+        # oldest first, and the form 4 listed under both issuer and owner only once
+        self.assertEqual(
+            [
+                "edgar/data/789019/0001564590-20-047996.txt",
+                "edgar/data/320193/0000320193-20-000096.txt",
+                "edgar/data/320193/0001209191-20-055218.txt",
+            ],
+            [record[4] for record in records],
+        )
+        self.assertEqual(
+            ["APPLE INC", "10-K", "320193", pd.Timestamp(2020, 10, 30)], records[1][:4]
+        )
+
+        # nothing new: the server doesn't even send the feed again
+        self.assertEqual([], watcher.poll())
+        self.assertEqual(1, self.server.stats[304])
+
+        self._add_feed_entry(_NEW_ENTRY)
+        self.assertEqual(
+            [
+                [
+                    "APPLE INC",
+                    "10-Q",
+                    "320193",
+                    pd.Timestamp(2020, 11, 5),
+                    "edgar/data/320193/0000320193-20-000100.txt",
+                ]
+            ],
+            watcher.poll(),
+        )
+
+    def test_history(self):
+        watcher = FilingWatcher(history=2)
+        self.assertEqual(3, len(watcher.poll()))
+        # the oldest filing is the one forgotten
+        self.assertEqual(
+            ["0000320193-20-000096", "0001209191-20-055218"],
+            list(watcher._seen_accessions),
+        )
+
+    def test_filters(self):
+        watcher = FilingWatcher(ciks="0001214128", form_types=["4", "10-K"])
+        self.assertEqual(
+            [
+                [
+                    "LEVINSON ARTHUR D",
+                    "4",
+                    "1214128",
+                    pd.Timestamp(2020, 11, 4),
+                    "edgar/data/1214128/0001209191-20-055218.txt",
+                ]
+            ],
+            watcher.poll(),
+        )
+
+        watcher = FilingWatcher(
+            since=dt.datetime(2020, 10, 29, tzinfo=dt.timezone.utc), form_types="10-K"
+        )
+        self.assertEqual(["10-K"], [record[1] for record in watcher.poll()])
+
+    def test_stream(self):
+        watcher = FilingWatcher(ciks="320193", poll_interval=0.01)
+
+        async def _collect():
+            records = []
+            async for record in watcher.stream(max_polls=3):
+                records.append(record)
+                if len(records) == 2:
+                    self._add_feed_entry(_NEW_ENTRY)
+            return records
+
+        records = asyncio.run(_collect())
+        self.assertEqual(["10-K", "4", "10-Q"], [record[1] for record in records])
+
+
+if __name__ == "__main__":
+    ut.main()
@@ -2,11 +2,81 @@
 utils.py is a kitchen sink of helper functions that I don't have a better place for for now.
 If this gets large enough, I'll separate out into reference_date/int/float/string utils...
 """
+
+from __future__ import annotations
+
+from contextlib import contextmanager
 import datetime as dt
+import importlib.util
 from math import ceil
-from typing import Any, List
+import os
+import sys
+import tempfile
+from types import ModuleType
+from typing import IO, Any, Iterator, List, Union
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module, deferring the actual (potentially slow) load
+    until one of its attributes is first accessed
+
+    Args:
+        name (str): Fully qualified module name, eg "pandas"
 
-from pandas import isna
+    Returns:
+        ModuleType: The module (or a lazy stand-in for it)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+@contextmanager
+def atomic_write(file_name: str, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """
+    Write a file through a temporary file next to it, which replaces it in one step
+    once the block completes; so a crash part way through leaves the previous version intact.
+    If the block raises, the temporary file is removed and `file_name` is left alone.
+
+        with atomic_write("index.csv", newline="") as f:
+            df.to_csv(f)
+
+    Args:
+        file_name (str): File to write
+        mode (str, optional): As for `open`, eg "wb". Defaults to "w".
+        **kwargs: Passed on to `open`, eg newline=""
+    """
+    directory, base_name = os.path.split(file_name)
+    file_descriptor, temp_file = tempfile.mkstemp(
+        prefix=f".{base_name}.", dir=directory or "."
+    )
+    try:
+        with os.fdopen(file_descriptor, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, file_name)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# what the date helpers accept in place of a single dt.date
+DateArray = Union["np.ndarray", "pd.Series", "pd.DatetimeIndex", List[dt.date]]
 
 
 def split_fixed_length(s: str, lengths: List[int], strip: bool = True) -> List[str]:
@@ -15,13 +85,13 @@ def split_fixed_length(s: str, lengths: List[int], strip: bool = True) -> List[s
 
     Args:
         s (str): The string
-        lengths (List[int]): 
+        lengths (List[int]):
             Ordered list of each fixed-length chunk size
             sum(lengths) <= len(s)
-            if sum(lengths) < len(s), the last element 
+            if sum(lengths) < len(s), the last element
             returned will be the remainder of the string
-        strip (bool, optional): 
-            Do I strip whitespace for each parsed element? 
+        strip (bool, optional):
+            Do I strip whitespace for each parsed element?
             Defaults to True.
     """
     # fmt: off
@@ -53,11 +123,41 @@ def ifna(value: Any, default: Any) -> Any:
         value (Any): The value
         default (Any): The default
     """
-    return value if not isna(value) else default
+    return value if not pd.isna(value) else default
+
+
+def _is_array(value: Any) -> bool:
+    """Is this a collection of dates (or years), rather than a single one?"""
+    # without touching numpy, so scalar callers don't pay for importing it
+    return hasattr(value, "__len__")
+
+
+def _to_datetime_index(values: DateArray) -> pd.DatetimeIndex:
+    """
+    Dates as a DatetimeIndex; accepts datetime64 arrays, Series (of datetime64,
+    or of dt.date objects like the period columns from the parsers) and lists of dates
+    """
+    return pd.DatetimeIndex(values)
+
+
+def _like(result, values: DateArray):
+    """Return a vectorized result in the same shape as the input: Series stay Series"""
+    if isinstance(values, pd.Series):
+        return pd.Series(np.asarray(result), index=values.index, name=values.name)
+    return np.asarray(result)
+
+
+def is_leap_year(
+    year: Union[int, np.ndarray, pd.Series],
+) -> Union[bool, np.ndarray, pd.Series]:
+    """
+    Determine if a year is a leap year
 
+    Also takes an array or Series of years, returning one of booleans
+    """
+    if _is_array(year):
+        return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
 
-def is_leap_year(year: int) -> bool:
-    """Determine if a year is a leap year"""
     if year % 4 == 0:
         if year % 100 == 0:
             return year % 400 == 0
@@ -67,8 +167,23 @@ def is_leap_year(year: int) -> bool:
         return False
 
 
-def add_months(reference_date: dt.date, months: int) -> dt.date:
-    """Find a new date that is `months` months from `reference_date`"""
+def add_months(
+    reference_date: Union[dt.date, DateArray], months: int
+) -> Union[dt.date, DateArray]:
+    """
+    Find a new date that is `months` months from `reference_date`
+
+    Also takes an array or Series of dates, returning datetime64 values
+    (in a Series, if given one); missing dates stay missing
+    """
+    if _is_array(reference_date):
+        # DateOffset clamps to the end of the month in the same way as below,
+        # and is applied to the whole array at once
+        return _like(
+            _to_datetime_index(reference_date) + pd.DateOffset(months=months),
+            reference_date,
+        )
+
     target_month = reference_date.month + months
 
     year = reference_date.year + target_month // 12
@@ -91,13 +206,67 @@ def add_months(reference_date: dt.date, months: int) -> dt.date:
     return dt.date(year, month, day)
 
 
-def get_quarter(reference_date: dt.date) -> int:
-    """Get the quarter (1-4) of the specified date"""
+def get_quarter(
+    reference_date: Union[dt.date, DateArray],
+) -> Union[int, np.ndarray, pd.Series]:
+    """
+    Get the quarter (1-4) of the specified date
+
+    Also takes an array or Series of dates, returning one of quarters
+    (as floats, with NaN for missing dates, if there are any)
+    """
+    if _is_array(reference_date):
+        return _like(_to_datetime_index(reference_date).quarter, reference_date)
+
     return int(ceil(reference_date.month / 3))
 
 
-def get_start_of_quarter(reference_date: dt.date) -> dt.date:
+def get_start_of_quarter(
+    reference_date: Union[dt.date, DateArray],
+) -> Union[dt.date, DateArray]:
+    """
+    Get the first day of the quarter the specified date falls in
+
+    Also takes an array or Series of dates, returning datetime64 values
+    """
+    if _is_array(reference_date):
+        return _like(
+            _to_datetime_index(reference_date).to_period("Q").start_time,
+            reference_date,
+        )
+
     year = reference_date.year
     month = (get_quarter(reference_date) - 1) * 3 + 1
     return dt.date(year, month, 1)
 
+
+def get_end_of_quarter(
+    reference_date: Union[dt.date, DateArray],
+) -> Union[dt.date, DateArray]:
+    """
+    Get the last day of the quarter the specified date falls in
+
+    Also takes an array or Series of dates, returning datetime64 values
+    """
+    if _is_array(reference_date):
+        return _like(
+            _to_datetime_index(reference_date).to_period("Q").end_time.normalize(),
+            reference_date,
+        )
+
+    return add_months(get_start_of_quarter(reference_date), 3) - dt.timedelta(days=1)
+
+
+def get_quarters(start_date: dt.date, end_date: dt.date) -> List[dt.date]:
+    """
+    List the quarters that overlap `start_date` to `end_date` (inclusive), oldest first
+
+    Returns:
+        List[dt.date]: First day of each quarter
+    """
+    quarter_start = get_start_of_quarter(start_date)
+    quarters = []
+    while quarter_start <= end_date:
+        quarters.append(quarter_start)
+        quarter_start = add_months(quarter_start, 3)
+    return quarters
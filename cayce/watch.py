@@ -0,0 +1,237 @@
+"""
+Watch EDGAR for new filings as they are accepted
+
+Polls the latest filings feed, which lists the most recent filings
+(newest first, one entry per company involved in each filing) within
+seconds of acceptance. Each poll is a conditional request for the first page,
+so when nothing has been filed the server answers with an empty 304;
+further pages are only fetched until they reach filings already seen.
+
+The feed only reaches back over the last few thousand filings, so use
+`EdgarIndex.search` to catch up on anything older.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import datetime as dt
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Union
+
+from lxml import etree
+
+from cayce.utils import lazy_import
+from cayce.log import get_logger
+from cayce import web
+
+pd = lazy_import("pandas")
+
+
+_LOG = get_logger(__name__)
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+# eg "4 - LEVINSON ARTHUR D (0001214128) (Reporting)"
+_TITLE_RE = re.compile(r"^(.+?) - (.+) \((\d+)\) \(([^)]+)\)$")
+_FILED_RE = re.compile(r"Filed:\s*(?:</b>)?\s*(\d{4}-\d{2}-\d{2})")
+_ACCESSION_RE = re.compile(r"(\d{10}-\d{2}-\d{6})")
+
+
+def _parse_entry(entry) -> Optional[dict]:
+    """Pull a filing record out of a feed entry"""
+    title_match = _TITLE_RE.match(entry.findtext(f"{_ATOM}title", "").strip())
+    accession_match = _ACCESSION_RE.search(entry.findtext(f"{_ATOM}id", ""))
+    filed_match = _FILED_RE.search(entry.findtext(f"{_ATOM}summary", ""))
+    updated = entry.findtext(f"{_ATOM}updated", "").strip()
+    if not (title_match and accession_match and filed_match and updated):
+        _LOG.warning("Ignoring feed entry that doesn't look like a filing")
+        return None
+
+    form_type, company, cik, _ = title_match.groups()
+    category = entry.find(f"{_ATOM}category")
+    if category is not None and category.get("term"):
+        form_type = category.get("term")
+    cik = str(int(cik))
+    accession = accession_match.group(1)
+    return {
+        "company": company,
+        "form_type": form_type,
+        "cik": cik,
+        "date_filed": filed_match.group(1),
+        "file_name": f"edgar/data/{cik}/{accession}.txt",
+        "accession": accession,
+        "updated": dt.datetime.fromisoformat(updated),
+    }
+
+
+class FilingWatcher:
+    def __init__(
+        self,
+        ciks: Union[str, List[str]] = None,
+        form_types: Union[str, List[str]] = None,
+        poll_interval: float = 5.0,
+        since: Optional[dt.datetime] = None,
+        page_size: int = 100,
+        max_pages: int = 10,
+        history: int = 10000,
+    ):
+        """
+        Create a watcher; call `poll` for new filings, or iterate over `watch` or `stream`
+
+        Args:
+            ciks (Union[str, List[str]], optional):
+                Only report filings involving these CIK codes. Defaults to None, which doesn't filter.
+            form_types (Union[str, List[str]], optional):
+                Only report these form types. Defaults to None, which doesn't filter.
+            poll_interval (float, optional): Seconds between polls in `watch` and `stream`. Defaults to 5.
+            since (dt.datetime, optional):
+                Only report filings accepted after this (timezone aware) time.
+                Defaults to None, which reports everything on the first page of the feed at the first poll.
+            page_size (int, optional): Entries requested per page of the feed. Defaults to 100.
+            max_pages (int, optional): Most pages to read in a single poll. Defaults to 10.
+            history (int, optional): How many accession numbers to remember, to drop repeats. Defaults to 10000.
+        """
+        if isinstance(ciks, str):
+            ciks = [ciks]
+        if isinstance(form_types, str):
+            form_types = [form_types]
+        self.ciks = {str(int(cik)) for cik in ciks} if ciks else None
+        self.form_types = set(form_types) if form_types else None
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.history = history
+
+        # acceptance time of the newest filing seen so far
+        self.cursor = since
+        # oldest first, so the oldest are forgotten first
+        self._seen_accessions = OrderedDict()
+        self._etag = None
+
+    def _feed_url(self, start: int) -> str:
+        # the feed can filter a single form type server side, which keeps pages small
+        form_type = (
+            next(iter(self.form_types))
+            if self.form_types and len(self.form_types) == 1
+            else ""
+        )
+        return web.url(
+            f"cgi-bin/browse-edgar?action=getcurrent&type={form_type}&company=&dateb="
+            f"&owner=include&start={start}&count={self.page_size}&output=atom"
+        )
+
+    def _fetch_page(self, start: int) -> Optional[list]:
+        """Fetch one page of feed entries, or None if the feed hasn't changed since the last poll"""
+        headers = None
+        if start == 0 and self._etag is not None:
+            headers = {"If-None-Match": self._etag}
+
+        response = web.get(self._feed_url(start), headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        if start == 0:
+            self._etag = response.headers.get("ETag")
+
+        root = etree.fromstring(response.content, etree.XMLParser(recover=True))
+        if root is None:
+            return []
+        return [
+            entry
+            for entry in (
+                _parse_entry(element) for element in root.iter(f"{_ATOM}entry")
+            )
+            if entry is not None
+        ]
+
+    def _is_wanted(self, entry: dict) -> bool:
+        if self.ciks is not None and entry["cik"] not in self.ciks:
+            return False
+        if self.form_types is not None and entry["form_type"] not in self.form_types:
+            return False
+        return True
+
+    def poll(self) -> List[List[Any]]:
+        """
+        Check the feed once for filings that haven't been reported yet
+
+        Returns:
+            List[List[Any]]:
+                New filings, oldest first, in the same form as the rows of `EdgarIndex.search`
+                (company, form type, CIK, date filed, file name), ready for `EdgarIndex.download_xbrl`
+        """
+        # newest first, as listed by the feed
+        new_entries = []
+        new_accessions = set()
+        newest = self.cursor
+        for page in range(self.max_pages):
+            entries = self._fetch_page(page * self.page_size)
+            if entries is None:
+                break
+
+            reached_cursor = False
+            for entry in entries:
+                if self.cursor is not None and entry["updated"] < self.cursor:
+                    reached_cursor = True
+                    break
+                if newest is None or entry["updated"] > newest:
+                    newest = entry["updated"]
+                # the feed lists a filing once for each company involved
+                if (
+                    entry["accession"] in self._seen_accessions
+                    or entry["accession"] in new_accessions
+                    or not self._is_wanted(entry)
+                ):
+                    continue
+                new_accessions.add(entry["accession"])
+                new_entries.append(entry)
+
+            if reached_cursor or self.cursor is None or len(entries) < self.page_size:
+                break
+
+        new_entries.reverse()
+        for entry in new_entries:
+            self._seen_accessions[entry["accession"]] = None
+        while len(self._seen_accessions) > self.history:
+            self._seen_accessions.popitem(last=False)
+        self.cursor = newest
+
+        return [
+            [
+                entry["company"],
+                entry["form_type"],
+                entry["cik"],
+                pd.Timestamp(entry["date_filed"]),
+                entry["file_name"],
+            ]
+            for entry in new_entries
+        ]
+
+    def watch(self, max_polls: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        Poll the feed every `poll_interval` seconds, yielding each new filing as it appears
+
+        Args:
+            max_polls (int, optional): Stop after this many polls. Defaults to None, which never stops.
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls > 0:
+                time.sleep(self.poll_interval)
+            polls += 1
+            yield from self.poll()
+
+    async def stream(self, max_polls: Optional[int] = None) -> AsyncIterator[List[Any]]:
+        """
+        Same as `watch`, as an async iterator; requests are made on the default executor,
+        so the event loop isn't blocked while waiting for EDGAR
+        """
+        loop = asyncio.get_running_loop()
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls > 0:
+                await asyncio.sleep(self.poll_interval)
+            polls += 1
+            for record in await loop.run_in_executor(None, self.poll):
+                yield record
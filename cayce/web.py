@@ -0,0 +1,136 @@
+"""
+Shared HTTP access to EDGAR, so that every caller in the process
+(including worker threads) honours the same request rate limit
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional
+
+from cayce.utils import lazy_import
+from cayce.log import get_logger
+
+requests = lazy_import("requests")
+
+
+_LOG = get_logger(__name__)
+
+# can be pointed somewhere else, eg a local `cayce.mock_edgar` server
+_base_url = os.environ.get("CAYCE_EDGAR_URL", "https://www.sec.gov")
+# responses that mean "back off and try again"
+_RETRY_STATUS_CODES = {429, 503}
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 6.1; WOW64; rv:50.0) Gecko/20100101 Firefox/50.0"
+}
+
+
+class RateLimiter:
+    def __init__(self, max_per_second: Optional[float] = None):
+        """
+        Space out calls so no more than `max_per_second` happen in any second
+
+        Args:
+            max_per_second (float, optional):
+                Maximum sustained call rate.
+                Defaults to None, which doesn't limit anything.
+        """
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.max_per_second = max_per_second
+
+    def wait(self):
+        """Block until the caller is allowed to make its next call"""
+        if not self.max_per_second:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.max_per_second
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_rate_limiter = RateLimiter()
+_local = threading.local()
+
+
+def set_rate_limit(max_per_second: Optional[float]):
+    """
+    Limit the number of requests per second made to EDGAR by this process
+
+    Args:
+        max_per_second (float, optional): Maximum request rate, or None for no limit
+    """
+    _rate_limiter.max_per_second = max_per_second
+
+
+def set_base_url(base_url: str):
+    """
+    Change the server that EDGAR requests are sent to
+
+    Args:
+        base_url (str): Scheme and host, eg "https://www.sec.gov"
+    """
+    global _base_url
+    _base_url = base_url.rstrip("/")
+
+
+def url(relative_path: str) -> str:
+    """
+    Build a full EDGAR URL
+
+    Args:
+        relative_path (str): Path on the EDGAR server, eg "Archives/edgar/full-index"
+    """
+    return f"{_base_url}/{relative_path.lstrip('/')}"
+
+
+def _get_session() -> requests.Session:
+    """Sessions aren't guaranteed to be thread safe, so keep one per thread"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers.update(_HEADERS)
+    return _local.session
+
+
+def get(
+    url: str,
+    stream: bool = False,
+    max_retries: int = 3,
+    backoff: float = 1.0,
+    headers: Optional[dict] = None,
+) -> requests.Response:
+    """
+    Issue a rate limited GET request, retrying if the server asks us to slow down
+
+    Args:
+        url (str): Full URL to fetch
+        stream (bool, optional): Stream the response body? Defaults to False.
+        max_retries (int, optional): How many times to retry a throttled request. Defaults to 3.
+        backoff (float, optional):
+            Seconds to wait before the first retry, doubling each time,
+            unless the server sends a Retry-After header. Defaults to 1.
+        headers (dict, optional):
+            Extra request headers, eg If-None-Match for a conditional request
+
+    Returns:
+        requests.Response: The response
+    """
+    for attempt in range(max_retries + 1):
+        _rate_limiter.wait()
+        _LOG.debug(f"GET {url}")
+        response = _get_session().get(url, stream=stream, headers=headers)
+        if response.status_code not in _RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+
+        retry_after = response.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else backoff * 2**attempt
+        _LOG.warning(f"Got {response.status_code} for {url}, retrying in {delay}s")
+        response.close()
+        time.sleep(delay)
@@ -3,6 +3,7 @@ import setuptools as st
 requirements = [
     "lxml >= 4.6.2",
     "pandas >= 1.0.5",
+    "requests",
 ]
 
 st.setup(
@@ -12,8 +13,11 @@ st.setup(
     author_email="andrewmlong@hotmail.com",
     description="Tools to search and download filing data from SEC EDGAR",
     url="https://github.com/along1x/cayce",
-    packages=st.find_packages(),
+    packages=st.find_namespace_packages(include=["cayce", "cayce.*"]),
+    package_data={"cayce.tests": ["fixtures/*.xml", "fixtures/edgar/**/*"]},
     install_requires=requirements,
+    extras_require={"parquet": ["pyarrow"]},
+    entry_points={"console_scripts": ["cayce = cayce.cli:main"]},
     classifiers=[
         "Development Status :: 4 - Beta",
         "Programming Language :: Python :: 3",